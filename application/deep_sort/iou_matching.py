@@ -39,6 +39,39 @@ def iou(bbox, candidates):
     return area_intersection / (area_bbox + area_candidates - area_intersection)
 
 
+def iou_matrix(bboxes, candidates):
+    """Compute intersection over union of every pair of bounding boxes.
+
+    Parameters
+    ----------
+    bboxes : ndarray
+        An Nx4 matrix of bounding boxes in format `(top left x, top left y,
+        width, height)`.
+    candidates : ndarray
+        An Mx4 matrix of candidate bounding boxes in the same format.
+
+    Returns
+    -------
+    ndarray
+        Returns an NxM matrix, where element (i, j) is the intersection over
+        union between `bboxes[i]` and `candidates[j]`, same as `iou`.
+
+    """
+    bboxes_tl, bboxes_br = bboxes[:, :2], bboxes[:, :2] + bboxes[:, 2:]
+    candidates_tl = candidates[:, :2]
+    candidates_br = candidates[:, :2] + candidates[:, 2:]
+
+    tl = np.maximum(bboxes_tl[:, np.newaxis, :], candidates_tl[np.newaxis])
+    br = np.minimum(bboxes_br[:, np.newaxis, :], candidates_br[np.newaxis])
+    wh = np.maximum(0., br - tl)
+
+    area_intersection = wh.prod(axis=2)
+    area_bboxes = bboxes[:, 2:].prod(axis=1)[:, np.newaxis]
+    area_candidates = candidates[:, 2:].prod(axis=1)[np.newaxis]
+    return area_intersection / (
+        area_bboxes + area_candidates - area_intersection)
+
+
 def iou_cost(tracks, detections, track_indices=None,
              detection_indices=None):
     """An intersection over union distance metric.
@@ -69,13 +102,16 @@ def iou_cost(tracks, detections, track_indices=None,
     if detection_indices is None:
         detection_indices = np.arange(len(detections))
 
-    cost_matrix = np.zeros((len(track_indices), len(detection_indices)))
-    for row, track_idx in enumerate(track_indices):
-        if tracks[track_idx].time_since_update > 1:
-            cost_matrix[row, :] = linear_assignment.INFTY_COST
-            continue
+    cost_matrix = np.full(
+        (len(track_indices), len(detection_indices)),
+        linear_assignment.INFTY_COST)
+    rows = np.array([
+        tracks[i].time_since_update <= 1 for i in track_indices], dtype=bool)
+    if not rows.any() or len(detection_indices) == 0:
+        return cost_matrix
 
-        bbox = tracks[track_idx].to_tlwh()
-        candidates = np.asarray([detections[i].tlwh for i in detection_indices])
-        cost_matrix[row, :] = 1. - iou(bbox, candidates)
+    bboxes = np.asarray([
+        tracks[i].to_tlwh() for i, row in zip(track_indices, rows) if row])
+    candidates = np.asarray([detections[i].tlwh for i in detection_indices])
+    cost_matrix[rows] = 1. - iou_matrix(bboxes, candidates)
     return cost_matrix
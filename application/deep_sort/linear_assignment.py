@@ -54,27 +54,56 @@ def min_cost_matching(
 
     cost_matrix = distance_metric(
         tracks, detections, track_indices, detection_indices)
+    return min_cost_assignment(
+        cost_matrix, max_distance, track_indices, detection_indices)
+
+
+def min_cost_assignment(
+        cost_matrix, max_distance, track_indices, detection_indices):
+    """Solve linear assignment problem of a precomputed cost matrix.
+
+    Parameters
+    ----------
+    cost_matrix : ndarray
+        The NxM dimensional cost matrix, where element (i, j) is the
+        association cost between `track_indices[i]` and
+        `detection_indices[j]`. Modified in place.
+    max_distance : float
+        Gating threshold. Associations with cost larger than this value are
+        disregarded.
+    track_indices : List[int]
+        List of track indices that maps rows in `cost_matrix` to tracks.
+    detection_indices : List[int]
+        List of detection indices that maps columns in `cost_matrix` to
+        detections.
+
+    Returns
+    -------
+    (List[(int, int)], List[int], List[int])
+        Returns the same tuple as `min_cost_matching`. Unmatched indices are
+        listed in order, followed by the assigned pairs above `max_distance`.
+
+    """
+    track_indices = np.asarray(track_indices)
+    detection_indices = np.asarray(detection_indices)
+
     cost_matrix[cost_matrix > max_distance] = max_distance + 1e-5
-    indices = linear_sum_assignment(cost_matrix)
-
-    indices = np.hstack([indices[0].reshape(
-        ((indices[0].shape[0]), 1)), indices[1].reshape(((indices[0].shape[0]), 1))])
-
-    matches, unmatched_tracks, unmatched_detections = [], [], []
-    for col, detection_idx in enumerate(detection_indices):
-        if col not in indices[:, 1]:
-            unmatched_detections.append(detection_idx)
-    for row, track_idx in enumerate(track_indices):
-        if row not in indices[:, 0]:
-            unmatched_tracks.append(track_idx)
-    for row, col in indices:
-        track_idx = track_indices[row]
-        detection_idx = detection_indices[col]
-        if cost_matrix[row, col] > max_distance:
-            unmatched_tracks.append(track_idx)
-            unmatched_detections.append(detection_idx)
-        else:
-            matches.append((track_idx, detection_idx))
+    rows, cols = linear_sum_assignment(cost_matrix)
+    valid = cost_matrix[rows, cols] <= max_distance
+
+    assigned_tracks = np.zeros(len(track_indices), dtype=bool)
+    assigned_tracks[rows] = True
+    assigned_detections = np.zeros(len(detection_indices), dtype=bool)
+    assigned_detections[cols] = True
+
+    matches = list(zip(track_indices[rows[valid]].tolist(),
+                       detection_indices[cols[valid]].tolist()))
+    unmatched_tracks = \
+        track_indices[~assigned_tracks].tolist() + \
+        track_indices[rows[~valid]].tolist()
+    unmatched_detections = \
+        detection_indices[~assigned_detections].tolist() + \
+        detection_indices[cols[~valid]].tolist()
     return matches, unmatched_tracks, unmatched_detections
 
 
@@ -83,6 +112,12 @@ def matching_cascade(
         track_indices=None, detection_indices=None):
     """Run matching cascade.
 
+    The cost matrix of all tracks and detections is computed once. Tracks are
+    then matched level by level in order of their age (time since update),
+    each level on the submatrix of its tracks and the detections left
+    unmatched by the previous levels. Only the ages present are visited, so
+    the cost does not grow with `cascade_depth`.
+
     Parameters
     ----------
     distance_metric : Callable[List[Track], List[Detection], List[int], List[int]) -> ndarray
@@ -122,24 +157,29 @@ def matching_cascade(
     if detection_indices is None:
         detection_indices = list(range(len(detections)))
 
-    unmatched_detections = detection_indices
+    if len(detection_indices) == 0 or len(track_indices) == 0:
+        return [], list(set(track_indices)), detection_indices
+
+    cost_matrix = distance_metric(
+        tracks, detections, track_indices, detection_indices)
+    ages = np.array([tracks[k].time_since_update for k in track_indices])
+    levels = np.unique(ages[(ages >= 1) & (ages <= cascade_depth)])
+
+    # Rows and columns of the cost matrix
+    unmatched_cols = np.arange(len(detection_indices))
     matches = []
-    for level in range(cascade_depth):
-        if len(unmatched_detections) == 0:  # No detections left
+    for level in levels:
+        if len(unmatched_cols) == 0:  # No detections left
             break
 
-        track_indices_l = [
-            k for k in track_indices
-            if tracks[k].time_since_update == 1 + level
-        ]
-        if len(track_indices_l) == 0:  # Nothing to match at this level
-            continue
-
-        matches_l, _, unmatched_detections = \
-            min_cost_matching(
-                distance_metric, max_distance, tracks, detections,
-                track_indices_l, unmatched_detections)
-        matches += matches_l
+        rows = np.flatnonzero(ages == level)
+        matches_l, _, unmatched_cols = min_cost_assignment(
+            cost_matrix[np.ix_(rows, unmatched_cols)], max_distance, rows,
+            unmatched_cols)
+        matches += [(track_indices[row], detection_indices[col])
+                    for row, col in matches_l]
+
+    unmatched_detections = [detection_indices[col] for col in unmatched_cols]
     unmatched_tracks = list(set(track_indices) - set(k for k, _ in matches))
     return matches, unmatched_tracks, unmatched_detections
 
@@ -183,11 +223,14 @@ def gate_cost_matrix(
     """
     gating_dim = 2 if only_position else 4
     gating_threshold = kalman_filter.chi2inv95[gating_dim]
+    if len(track_indices) == 0 or len(detection_indices) == 0:
+        return cost_matrix
+
     measurements = np.asarray(
         [detections[i].to_xyah() for i in detection_indices])
-    for row, track_idx in enumerate(track_indices):
-        track = tracks[track_idx]
-        gating_distance = kf.gating_distance(
-            track.mean, track.covariance, measurements, only_position)
-        cost_matrix[row, gating_distance > gating_threshold] = gated_cost
+    means = np.asarray([tracks[i].mean for i in track_indices])
+    covariances = np.asarray([tracks[i].covariance for i in track_indices])
+    gating_distance = kf.gating_distance_batch(
+        means, covariances, measurements, only_position)
+    cost_matrix[gating_distance > gating_threshold] = gated_cost
     return cost_matrix
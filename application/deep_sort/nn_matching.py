@@ -175,3 +175,128 @@ class NearestNeighborDistanceMetric(object):
         for i, target in enumerate(targets):
             cost_matrix[i, :] = self._metric(self.samples[target], features)
         return cost_matrix
+
+
+class GalleryDistanceMetric(object):
+    """
+    A nearest neighbor cosine distance metric with a bounded gallery. The
+    samples of every target are kept as pre-normalized float32 rows of one
+    preallocated matrix, in a ring of at most `budget` rows per target that
+    overwrites the oldest sample. Memory is bounded by the number of targets
+    present at once, not by how long they are tracked.
+
+    Parameters
+    ----------
+    matching_threshold: float
+        The matching threshold. Samples with larger distance are considered an
+        invalid match.
+    budget : int
+        Number of samples kept per target.
+    feature_dim : int
+        Dimensionality of the features.
+    capacity : int
+        Number of targets allocated up front, doubled whenever it runs out.
+
+    Attributes
+    ----------
+    gallery : ndarray
+        A (capacity * budget)xM matrix of normalized samples, the samples of
+        the target in slot i are rows `i * budget` to `i * budget + counts[i]`.
+    counts : ndarray
+        Number of samples stored for every slot.
+    slots : Dict[int -> int]
+        A dictionary that maps from target identities to their slots.
+
+    """
+
+    def __init__(self, matching_threshold, budget=100, feature_dim=128,
+                 capacity=64):
+        self.matching_threshold = matching_threshold
+        self.budget = budget
+        self.gallery = np.zeros((capacity * budget, feature_dim), np.float32)
+        self.counts = np.zeros(capacity, np.int64)
+        self.heads = np.zeros(capacity, np.int64)
+        self.slots = {}
+        self._free = list(range(capacity))[::-1]
+
+    def _allocate(self, target):
+        if len(self._free) == 0:
+            capacity = len(self.counts)
+            self.gallery = np.concatenate(
+                (self.gallery, np.zeros_like(self.gallery)))
+            self.counts = np.concatenate(
+                (self.counts, np.zeros_like(self.counts)))
+            self.heads = np.concatenate(
+                (self.heads, np.zeros_like(self.heads)))
+            self._free = list(range(capacity, 2 * capacity))[::-1]
+
+        slot = self._free.pop()
+        self.slots[target] = slot
+        self.counts[slot], self.heads[slot] = 0, 0
+        return slot
+
+    def partial_fit(self, features, targets, active_targets):
+        """Update the distance metric with new data.
+
+        Parameters
+        ----------
+        features : ndarray
+            An NxM matrix of N features of dimensionality M.
+        targets : ndarray
+            An integer array of associated target identities.
+        active_targets : List[int]
+            A list of targets that are currently present in the scene.
+
+        """
+        if len(features) > 0:
+            features = np.asarray(features, np.float32)
+            features = features / np.linalg.norm(
+                features, axis=1, keepdims=True)
+
+        for feature, target in zip(features, targets):
+            slot = self.slots.get(target)
+            if slot is None:
+                slot = self._allocate(target)
+
+            self.gallery[slot * self.budget + self.heads[slot]] = feature
+            self.heads[slot] = (self.heads[slot] + 1) % self.budget
+            self.counts[slot] = min(self.counts[slot] + 1, self.budget)
+
+        active_targets = set(active_targets)
+        for target in [t for t in self.slots if t not in active_targets]:
+            self._free.append(self.slots.pop(target))
+
+    def distance(self, features, targets):
+        """Compute distance between features and targets.
+
+        Parameters
+        ----------
+        features : ndarray
+            An NxM matrix of N features of dimensionality M.
+        targets : List[int]
+            A list of targets to match the given `features` against.
+
+        Returns
+        -------
+        ndarray
+            Returns a cost matrix of shape len(targets), len(features), where
+            element (i, j) contains the closest cosine distance between
+            `targets[i]` and `features[j]`.
+
+        """
+        if len(targets) == 0 or len(features) == 0:
+            return np.zeros((len(targets), len(features)))
+
+        slots = np.array([self.slots[target] for target in targets])
+        counts = self.counts[slots]
+
+        # Gallery rows of the targets, one segment per target
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        rows = np.arange(counts.sum()) - np.repeat(offsets, counts) + \
+            np.repeat(slots * self.budget, counts)
+
+        features = np.asarray(features, np.float32)
+        features = features / np.linalg.norm(features, axis=1, keepdims=True)
+        distances = 1. - np.dot(self.gallery[rows], features.T)
+        return np.minimum.reduceat(distances, offsets, axis=0).astype(
+            np.float64)
@@ -116,6 +116,80 @@ def create_box_encoder(model_filename, input_name="images",
     return encoder
 
 
+class BatchedBoxEncoder(object):
+    """
+    Box encoder filling a preallocated patch tensor and running the network
+    in fixed-size batches. The last batch is padded to `batch_size`, so the
+    graph always sees the same input shape.
+
+    Parameters
+    ----------
+    image_encoder : ImageEncoder
+        The appearance network.
+    batch_size : int
+        Number of patches per network run.
+    capacity : int
+        Number of patches allocated up front, grown in whole batches when a
+        frame has more boxes.
+
+    """
+
+    def __init__(self, image_encoder, batch_size=16, capacity=64):
+        self.image_encoder = image_encoder
+        self.batch_size = batch_size
+        self.image_shape = image_encoder.image_shape
+        self.patches = np.zeros(
+            [self._padded(capacity)] + self.image_shape, np.uint8)
+
+    def _padded(self, count):
+        return max(1, -(-count // self.batch_size)) * self.batch_size
+
+    def __call__(self, image, boxes):
+        """Compute appearance features of the boxes.
+
+        Parameters
+        ----------
+        image : ndarray
+            The BGR color image.
+        boxes : array_like
+            An Nx4 matrix of bounding boxes in format (x, y, width, height).
+
+        Returns
+        -------
+        ndarray
+            An NxM matrix of N feature vectors of dimensionality M.
+
+        """
+        count = len(boxes)
+        if count > len(self.patches):
+            self.patches = np.zeros(
+                [self._padded(count)] + self.image_shape, np.uint8)
+
+        for i, box in enumerate(boxes):
+            patch = extract_image_patch(image, box, self.image_shape[:2])
+            if patch is None:
+                print("WARNING: Failed to extract image patch: %s." % str(box))
+                patch = np.random.uniform(
+                    0., 255., self.image_shape).astype(np.uint8)
+            self.patches[i] = patch
+
+        encoder = self.image_encoder
+        out = np.zeros((count, encoder.feature_dim), np.float32)
+        for s in range(0, count, self.batch_size):
+            e = min(s + self.batch_size, count)
+            features = encoder.session.run(encoder.output_var, feed_dict={
+                encoder.input_var: self.patches[s:s + self.batch_size]})
+            out[s:e] = features[:e - s]
+        return out
+
+
+def create_batched_box_encoder(model_filename, input_name="images",
+                               output_name="features", batch_size=16):
+    image_encoder = ImageEncoder(model_filename, input_name, output_name)
+
+    return BatchedBoxEncoder(image_encoder, batch_size)
+
+
 def generate_detections(encoder, mot_dir, output_dir, detection_dir=None):
     """Generate detections with features.
 
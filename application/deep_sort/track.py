@@ -1,4 +1,5 @@
 # vim: expandtab:ts=4:sw=4
+import numpy as np
 
 
 class TrackState:
@@ -16,6 +17,53 @@ class TrackState:
     Deleted = 3
 
 
+class TrackStates:
+    """
+    Stacked state distributions of all tracks of a tracker, so that the Kalman
+    filter steps run once for all tracks. Rows are kept in the order of the
+    tracker's track list, the first `count` rows are in use.
+
+    Parameters
+    ----------
+    capacity : int
+        Number of rows allocated up front, doubled whenever it runs out.
+
+    Attributes
+    ----------
+    means : ndarray
+        The Nx8 dimensional mean vectors.
+    covariances : ndarray
+        The Nx8x8 dimensional covariance matrices.
+    count : int
+        Number of rows in use.
+
+    """
+
+    def __init__(self, capacity=64):
+        self.means = np.zeros((capacity, 8))
+        self.covariances = np.zeros((capacity, 8, 8))
+        self.count = 0
+
+    def append(self, mean, covariance):
+        """Add a state distribution and return its row."""
+        if self.count == len(self.means):
+            self.means = np.concatenate((self.means, np.zeros_like(self.means)))
+            self.covariances = np.concatenate(
+                (self.covariances, np.zeros_like(self.covariances)))
+
+        self.means[self.count] = mean
+        self.covariances[self.count] = covariance
+        self.count += 1
+        return self.count - 1
+
+    def compact(self, rows):
+        """Keep only the given rows, moved to the front in the given order."""
+        rows = np.asarray(rows, dtype=np.int64)
+        self.means[:len(rows)] = self.means[rows]
+        self.covariances[:len(rows)] = self.covariances[rows]
+        self.count = len(rows)
+
+
 class Track:
     """
     A single target track with state space `(x, y, a, h)` and associated
@@ -40,6 +88,10 @@ class Track:
     feature : Optional[ndarray]
         Feature vector of the detection this track originates from. If not None,
         this feature is added to the `features` cache.
+    states : Optional[TrackStates]
+        Stacked states to keep the mean and covariance in. If not None, the
+        track is a view of its row and `mean` and `covariance` read and write
+        that row.
 
     Attributes
     ----------
@@ -64,9 +116,13 @@ class Track:
     """
 
     def __init__(self, mean, covariance, track_id, n_init, max_age,
-                 feature=None, class_name=None):
-        self.mean = mean
-        self.covariance = covariance
+                 feature=None, class_name=None, states=None):
+        self.states = states
+        if states is not None:
+            self.slot = states.append(mean, covariance)
+        else:
+            self._mean = mean
+            self._covariance = covariance
         self.track_id = track_id
         self.hits = 1
         self.age = 1
@@ -86,6 +142,32 @@ class Track:
         self.counted = False
         self.points = []
 
+    @property
+    def mean(self):
+        if self.states is not None:
+            return self.states.means[self.slot]
+        return self._mean
+
+    @mean.setter
+    def mean(self, value):
+        if self.states is not None:
+            self.states.means[self.slot] = value
+        else:
+            self._mean = value
+
+    @property
+    def covariance(self):
+        if self.states is not None:
+            return self.states.covariances[self.slot]
+        return self._covariance
+
+    @covariance.setter
+    def covariance(self, value):
+        if self.states is not None:
+            self.states.covariances[self.slot] = value
+        else:
+            self._covariance = value
+
     def to_tlwh(self):
         """Get current position in bounding box format `(top left x, top left y,
         width, height)`.
@@ -146,6 +228,19 @@ class Track:
         """
         self.mean, self.covariance = kf.update(
             self.mean, self.covariance, detection.to_xyah())
+        self.mark_hit(detection)
+
+    def mark_hit(self, detection):
+        """Update the feature cache and track state after the measurement
+        update of this track (done by `update` or by the tracker for all
+        tracks at once).
+
+        Parameters
+        ----------
+        detection : Detection
+            The associated detection.
+
+        """
         self.features.append(detection.feature)
 
         self.hits += 1
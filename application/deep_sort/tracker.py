@@ -4,7 +4,7 @@ import numpy as np
 from . import kalman_filter
 from . import linear_assignment
 from . import iou_matching
-from .track import Track
+from .track import Track, TrackStates
 
 
 class Tracker:
@@ -21,6 +21,9 @@ class Tracker:
         Number of consecutive detections before the track is confirmed. The
         track state is set to `Deleted` if a miss occurs within the first
         `n_init` frames.
+    batched : bool
+        If True, the states of all tracks are kept in stacked arrays and
+        predicted and updated with single batched Kalman filter steps.
 
     Attributes
     ----------
@@ -37,13 +40,15 @@ class Tracker:
 
     """
 
-    def __init__(self, metric, max_iou_distance=0.9, max_age=100, n_init=5):
+    def __init__(self, metric, max_iou_distance=0.9, max_age=100, n_init=5,
+                 batched=False):
         self.metric = metric
         self.max_iou_distance = max_iou_distance
         self.max_age = max_age
         self.n_init = n_init
 
         self.kf = kalman_filter.KalmanFilter()
+        self.states = TrackStates() if batched else None
         self.tracks = []
         self._next_id = 1
 
@@ -52,8 +57,18 @@ class Tracker:
 
         This function should be called once every time step, before `update`.
         """
+        if self.states is None:
+            for track in self.tracks:
+                track.predict(self.kf)
+            return
+
+        n = self.states.count
+        self.states.means[:n], self.states.covariances[:n] = \
+            self.kf.predict_batch(
+                self.states.means[:n], self.states.covariances[:n])
         for track in self.tracks:
-            track.predict(self.kf)
+            track.age += 1
+            track.time_since_update += 1
 
     def update(self, detections):
         """Perform measurement update and track management.
@@ -69,14 +84,21 @@ class Tracker:
             self._match(detections)
 
         # Update track set.
-        for track_idx, detection_idx in matches:
-            self.tracks[track_idx].update(
-                self.kf, detections[detection_idx])
+        if self.states is None:
+            for track_idx, detection_idx in matches:
+                self.tracks[track_idx].update(
+                    self.kf, detections[detection_idx])
+        elif len(matches) > 0:
+            self._update_batch(detections, matches)
         for track_idx in unmatched_tracks:
             self.tracks[track_idx].mark_missed()
         for detection_idx in unmatched_detections:
             self._initiate_track(detections[detection_idx])
         self.tracks = [t for t in self.tracks if not t.is_deleted()]
+        if self.states is not None:
+            self.states.compact([t.slot for t in self.tracks])
+            for slot, track in enumerate(self.tracks):
+                track.slot = slot
 
         # Update distance metric.
         active_targets = [t.track_id for t in self.tracks if t.is_confirmed()]
@@ -90,6 +112,17 @@ class Tracker:
         self.metric.partial_fit(
             np.asarray(features), np.asarray(targets), active_targets)
 
+    def _update_batch(self, detections, matches):
+        rows = np.array([self.tracks[i].slot for i, _ in matches])
+        measurements = np.array(
+            [detections[j].to_xyah() for _, j in matches], dtype=np.float64)
+        self.states.means[rows], self.states.covariances[rows] = \
+            self.kf.update_batch(
+                self.states.means[rows], self.states.covariances[rows],
+                measurements)
+        for track_idx, detection_idx in matches:
+            self.tracks[track_idx].mark_hit(detections[detection_idx])
+
     def _match(self, detections):
 
         def gated_metric(tracks, dets, track_indices, detection_indices):
@@ -135,5 +168,5 @@ class Tracker:
         class_name = detection.get_class()
         self.tracks.append(Track(
             mean, covariance, self._next_id, self.n_init, self.max_age,
-            detection.feature, class_name))
+            detection.feature, class_name, self.states))
         self._next_id += 1
@@ -0,0 +1,123 @@
+import os
+import threading
+import dotenv
+
+
+# Attribute: (.env key, type, default)
+FIELDS = {
+    'confidenceThreshold': ('CONFIDENCE_THRESHOLD', float, 0.5),
+    'showTracks': ('SHOW_TRACKS', bool, False),
+    'showPolygons': ('SHOW_POLYGONS', bool, False),
+    'motionGate': ('MOTION_GATE', bool, False),
+    'detectROI': ('DETECT_ROI', bool, False),
+    'headless': ('HEADLESS', bool, False),
+}
+
+config, writer = None, None
+configLock = threading.Lock()
+
+
+def parseValue(value, type, default):
+    if value is None or value == '':
+        return default
+    if type is bool:
+        return value if isinstance(value, bool) else value == 'True'
+
+    return type(value)
+
+
+"""
+Runtime settings changed from the dashboard. Values are parsed once per
+change and read as plain attributes (config.confidenceThreshold) by the
+processing loop. Every change increments the version and is passed to the
+subscribers as callback(config, changes) outside of the lock.
+"""
+class RuntimeConfig():
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = []
+        self.version = 0
+
+        for name, (key, type, default) in FIELDS.items():
+            setattr(self, name, parseValue(os.getenv(key), type, default))
+
+    def subscribe(self, callback):
+        with self.lock:
+            self.subscribers.append(callback)
+
+    # Sets the given attributes, values can be typed or .env strings
+    def update(self, **values):
+        with self.lock:
+            changes = {}
+            for name, value in values.items():
+                key, type, default = FIELDS[name]
+                value = parseValue(value, type, default)
+                if getattr(self, name) != value:
+                    setattr(self, name, value)
+                    changes[name] = value
+
+            if len(changes) == 0:
+                return
+            self.version += 1
+            subscribers = list(self.subscribers)
+
+        for callback in subscribers:
+            callback(self, changes)
+
+    # Returns the current values of all attributes
+    def getValues(self):
+        return {name: getattr(self, name) for name in FIELDS}
+
+
+"""
+Saves config changes to the .env file on a background timer. Changes coming
+in quick succession (i.e. a dragged slider) are written once, after delay
+seconds without another change.
+"""
+class EnvWriter():
+    def __init__(self, path, delay=2.0):
+        self.path = path
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.timer = None
+
+    def changed(self, config, changes):
+        with self.lock:
+            for name, value in changes.items():
+                self.pending[FIELDS[name][0]] = str(value)
+                os.environ[FIELDS[name][0]] = str(value)
+
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.delay, self.save)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def save(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.timer = None
+
+        for key, value in pending.items():
+            dotenv.set_key(self.path, key, value)
+
+
+"""
+Returns the shared runtime config, loaded from the environment on first use.
+With persist, changes are also saved to the .env file.
+"""
+def getConfig(persist=False):
+    global config, writer
+
+    if config is not None and not persist:
+        return config
+
+    with configLock:
+        if config is None:
+            config = RuntimeConfig()
+        if persist and writer is None and dotenv.find_dotenv():
+            writer = EnvWriter(dotenv.find_dotenv())
+            config.subscribe(writer.changed)
+
+        return config
@@ -0,0 +1,804 @@
+import dash
+import cv2
+import time
+import os
+import dotenv
+import threading
+import numpy as np
+import pandas as pd
+from flask import Flask, Response, jsonify, abort
+import dash_bootstrap_components as dbc
+from dash.dependencies import Input, Output, State
+import plotly.express as px
+from datetime import datetime
+from dash import html, dcc
+import plotly.graph_objs as go
+
+from layout import layout
+from stream import openStream, FrameBroadcaster, EncodeWorker, options
+from scheduler import FrameScheduler
+from pipeline import ProcessPipeline
+from multicam import loadCameras
+from polygons import getStore
+from config import getConfig
+from database import *
+from utils import *
+from detection import detectVehicles, detectBatch, trackVehicles, updateTracks, getRoutesLen, hasMotion, getEncodeTime
+
+
+# Params
+USE_DB = True
+SHOW_LABELS = True
+ALLOWED_CLASSES = ['car', 'bus', 'truck']
+FPS = 0
+SAVE_INTERVAL = 300
+
+# Pipeline metrics served on /metrics
+metrics = {}
+lastSave = time.time()
+
+"""
+Saves collected data every SAVE_INTERVAL seconds (5 min).
+"""
+def storeData():
+    global points, lastSave
+    if len(data) > 10 and time.time() - lastSave >= SAVE_INTERVAL:
+        if USE_DB:
+            insert(data, points)
+        else:
+            saveData(data, points)
+
+        # empty the points df
+        points = points[0:0]
+        lastSave = time.time()
+
+"""
+Main loop for the frame processing. Annotated frames are encoded off the loop
+and published to the broadcaster shared by all /video_stream clients.
+"""
+def run(stream, broadcaster):
+    global data, points, frame, FPS
+    encoder = EncodeWorker(broadcaster)
+    scheduler = FrameScheduler(sourceFPS=options['CAP_PROP_FPS'])
+    prevTime = 0
+    frameCount = 0
+    while True:       
+        frame = stream.getFrame()
+        if frame is None:
+            break
+        frameCount += 1
+
+        if frameCount == 1:            
+            cv2.imwrite('./application/resources/canvas_bg.png', frame)
+
+        # Processing only every n-th frame, n is picked by the scheduler
+        if not scheduler.shouldProcess(stream.lastCaptured):
+            prevTime = time.time()
+            continue
+        
+        # Detect vehicles in a frame
+        startTime = time.time()
+        if hasMotion(frame):
+            classes, confidences, boxes = detectVehicles(frame, ALLOWED_CLASSES)
+        else:
+            classes, confidences, boxes = None, None, None
+
+        # Track detected vehicles, the overlay is drawn only if somebody is watching
+        frame, data, points = trackVehicles(frame, data, points, classes, confidences, boxes,
+                                            draw=broadcaster.getClients() > 0)
+         
+        storeData()
+
+        # Encode frame to JPEG, only if somebody is watching
+        encoder.submit(frame)
+
+        currTime = time.time()
+        FPS = 1 / (currTime - prevTime)
+        prevTime = currTime  
+
+        scheduler.update(currTime - startTime, 0 if boxes is None else len(boxes))
+        metrics.update(fps=FPS, stride=scheduler.stride, skipped=stream.skipped, encode=encoder.encodeTime,
+                       reid=getEncodeTime())
+
+
+"""
+Collects the output of the multi-process pipeline. Publishes encoded
+frames, stores counted vehicles and forwards changed settings to the stages.
+"""
+def collect(pipeline, broadcaster):
+    global data, points, FPS
+    prevTime = time.time()
+    while True:
+        settings = getConfig().getValues()
+        settings['ALLOWED_CLASSES'] = ALLOWED_CLASSES
+        settings['POLYGONS_VERSION'] = getStore().version
+        pipeline.updateSettings(settings)
+        pipeline.setClients(broadcaster.getClients())
+
+        result = pipeline.getResult()
+        if result is None:
+            break
+
+        if result[0] == 'data':
+            data.extend(result[1])
+            points.extend(result[2])
+            continue
+
+        _, jpeg, meta = result
+
+        storeData()
+
+        currTime = time.time()
+        FPS = 1 / (currTime - prevTime)
+        prevTime = currTime
+        metrics.update(fps=FPS, stride=meta['stride'], skipped=meta['skipped'], times=meta['times'])
+
+        if jpeg is not None:
+            broadcaster.publish(jpeg)
+
+
+"""
+Main loop of the multi-camera mode. Frames of all cameras go through YOLO
+as a single batch, then every camera is tracked with its own tracker and
+published to its own broadcaster.
+"""
+def runCameras(cameras, broadcasters):
+    global data, points, FPS
+    encoders = [EncodeWorker(output) for output in broadcasters]
+    scheduler = FrameScheduler(sourceFPS=options['CAP_PROP_FPS'])
+    prevTime = time.time()
+    frameCount = 0
+    while True:
+        frames = [camera.stream.getFrame() for camera in cameras]
+        if any(frame is None for frame in frames):
+            break
+        frameCount += 1
+
+        if frameCount == 1:
+            cv2.imwrite('./application/resources/canvas_bg.png', frames[0])
+
+        # Processing only every n-th frame, n is picked by the scheduler
+        if not scheduler.shouldProcess(cameras[0].stream.lastCaptured):
+            continue
+
+        # Detect vehicles in all changed frames at once
+        startTime = time.time()
+        active = [i for i, camera in enumerate(cameras) if camera.hasMotion(frames[i])]
+        detections = [(None, None, None)] * len(cameras)
+        if len(active) > 0:
+            polygons = [cameras[i].polygons.get() for i in active]
+            results = detectBatch([frames[i] for i in active], [p.maskImage for p in polygons],
+                                  ALLOWED_CLASSES, [p.regions for p in polygons])
+            for i, result in zip(active, results):
+                detections[i] = result
+
+        # Track detected vehicles
+        vehicles, reidTime = 0, 0
+        for camera, frame, (classes, confidences, boxes), encoder in zip(cameras, frames, detections, encoders):
+            frame, data, points = updateTracks(camera.tracker, camera.polygons, frame, data, points,
+                                               classes, confidences, boxes, draw=encoder.broadcaster.getClients() > 0,
+                                               camera=camera.name)
+            vehicles += 0 if boxes is None else len(boxes)
+            reidTime += getEncodeTime()
+
+            encoder.submit(frame)
+
+        storeData()
+
+        currTime = time.time()
+        FPS = 1 / (currTime - prevTime)
+        prevTime = currTime
+
+        scheduler.update(currTime - startTime, vehicles)
+        metrics.update(fps=FPS, stride=scheduler.stride, cameras=len(cameras),
+                       skipped=sum(camera.stream.skipped for camera in cameras), reid=reidTime)
+
+
+"""
+Starts the single processing pipeline on the first request.
+Every other client only subscribes to its output. With PIPELINE_MODE=process
+each stage runs in its own process, with PIPELINE_MODE=multicam all cameras
+from cameras.json are processed together, otherwise everything runs in one thread.
+"""
+def startPipeline():
+    global pipeline
+    with pipelineLock:
+        if pipeline is None or not pipeline.is_alive():
+            if isinstance(pipeline, ProcessPipeline):
+                pipeline.stop()
+
+            if os.getenv('PIPELINE_MODE') == 'process':
+                lastID = max((d['VehicleID'] for d in data), default=None)
+                pipeline = ProcessPipeline(ALLOWED_CLASSES, lastID)
+                pipeline.start()
+                threading.Thread(target=collect, args=(pipeline, broadcaster), daemon=True).start()
+            elif os.getenv('PIPELINE_MODE') == 'multicam':
+                cameras = loadCameras()
+                while len(broadcasters) < len(cameras):
+                    broadcasters.append(FrameBroadcaster())
+                pipeline = threading.Thread(target=runCameras, args=(cameras, broadcasters), daemon=True)
+                pipeline.start()
+            else:
+                pipeline = threading.Thread(target=run, args=(openStream(), broadcaster), daemon=True)
+                pipeline.start()
+
+
+#############
+# Server Init
+#############
+
+server = Flask(__name__)
+app = dash.Dash("Real-time Traffic Detection", server=server, external_stylesheets=[dbc.themes.BOOTSTRAP, dbc.icons.BOOTSTRAP], meta_tags=[
+                {"name": "viewport", "content": "width=device-width"}], assets_folder='application/assets',suppress_callback_exceptions=True)
+
+
+broadcaster = FrameBroadcaster()
+broadcasters = [broadcaster]
+pipeline = None
+pipelineLock = threading.Lock()
+
+@server.route('/video_stream')
+def video_stream():
+    startPipeline()
+    if getConfig().headless:
+        abort(404)
+    return Response(broadcaster.subscribe(), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@server.route('/video_stream/<int:camera>')
+def camera_stream(camera):
+    startPipeline()
+    if getConfig().headless or camera >= len(broadcasters):
+        abort(404)
+    return Response(broadcasters[camera].subscribe(), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@server.route('/metrics')
+def pipeline_metrics():
+    return jsonify(metrics)
+
+app.layout = layout()
+
+
+##################
+# Sidebar elements
+##################
+
+# Show polygons switch
+@app.callback(
+    Output('emptyDiv2', 'children'),
+    Input('showPolygons', 'on'))
+def polygon_callback(on):
+    getConfig(persist=True).update(showPolygons=on)
+
+# Show tracks switch
+@app.callback(
+    Output('emptyDiv3', 'children'),
+    Input('showTracks', 'on'))
+def label_callback(on):
+    getConfig(persist=True).update(showTracks=on)
+
+# Use DB switch
+@app.callback(
+    Output('emptyDiv12', 'children'),
+    Input('saveDB', 'on'))
+def db_callback(on):
+    global USE_DB
+    USE_DB = on
+
+# Confidence slider
+@app.callback(
+    Output('emptyDiv5', 'children'),
+    Input('confidenceSlider', 'value'))
+def confidence_callback(value):
+    getConfig(persist=True).update(confidenceThreshold=value)
+
+# Class select dropdown
+@app.callback(
+    Output('emptyDiv6', 'children'),
+    Input('classSelect', 'value'))
+def classes_callback(value):
+    global ALLOWED_CLASSES
+    ALLOWED_CLASSES = [x.lower() for x in value]
+
+# DATE PICKER
+@app.callback(
+    Output('emptyDiv1', 'children'),
+    Input('date-picker-range', 'start_date'),
+    Input('date-picker-range', 'end_date'))
+def update_output(start_date, end_date):
+    if start_date is not None:
+        start_date_object = datetime.strptime(start_date, '%Y-%m-%d')
+
+    if end_date is not None:
+        end_date_object = datetime.strptime(end_date, '%Y-%m-%d')  
+
+# DOWNLOAD BUTTON
+@app.callback(
+    Output("download-data", "data"),
+    Input("btn-download-data", "n_clicks"),
+    Input('date-picker-range', 'start_date'),
+    Input('date-picker-range', 'end_date'),
+    Input('download-dropdown', 'value'),
+    prevent_initial_call=True,
+)
+def func(n_clicks,start_date, end_date, value):
+    if n_clicks and value in ['Vehicles', 'Points']:
+        downData = download(start_date, end_date, value)
+        if value == 'Vehicles':
+            return dcc.send_data_frame(downData.to_csv, "vehicleData-{0}_{1}.csv".format(start_date, end_date))
+        if value == 'Points':
+            return dcc.send_data_frame(downData.to_csv, "vehiclePoints-{0}_{1}.csv".format(start_date, end_date))
+
+
+###########
+# Charts
+###########
+
+# PIE CHART
+@app.callback(
+    Output('pieChart', 'children'),
+    Input('emptyDiv6', 'children')
+)
+def update_pieChart(children):
+    return [        
+          html.Div(
+                children=[                    
+                    dcc.Graph(
+                        id="pie-object-count",
+                        figure=dict(
+                            layout={
+                                "paper_bgcolor": "#1E1E1E",
+                                "plot_bgcolor": "#1E1E1E",
+                            }
+                        ),
+                    ),
+                ]
+            )]
+        
+
+@app.callback(
+    Output("pie-object-count", "figure"),
+    [Input("interval-updating-fiveSec", "n_intervals")],
+)
+def update_object_count_pie(n_intervals):
+    global data
+    layout = go.Layout(
+        showlegend=True,
+        title='Vehicle diversity',
+        paper_bgcolor="#1E1E1E",
+        plot_bgcolor="rgb(255,255,255)",
+        autosize=False,
+        font=dict(
+            color="White"
+        )
+    )
+    
+    if len(data) != 0:
+        #Get dataframe from list
+        headers = ['ID','Timestamp', 'Class', 'Origin', 'Exit']
+        df_data = pd.DataFrame(data, columns=headers)
+        
+        # Get the count of each object class
+        class_counts = df_data["Class"].value_counts()
+
+        classes = class_counts.index.tolist()  # List of each class
+        counts = class_counts.tolist()  # List of each count
+    else:
+        classes = ['No Data']
+        counts = [1]
+    text = [f"{count} detected" for count in counts]
+
+    # Set colorscale to piechart
+    colorscale = [
+        "#fa4f56",
+        "#fe6767",
+        "#ff7c79",
+        "#ff908b",
+        "#ffa39d",
+        "#ffb6b0",
+        "#ffc8c3",
+        "#ffdbd7",
+        "#ffedeb",
+        "#ffffff",
+    ]
+
+    pie = go.Pie(
+        labels=classes,
+        values=counts,
+        text=text,
+        hoverinfo="text+percent",
+        textinfo="label+percent",
+        marker={"colors": colorscale[: len(classes)]},
+    )
+    
+    return go.Figure(data=[pie], layout=layout)
+    
+
+# Bar chart
+@app.callback(
+    Output('barChart', 'figure'),
+    Input('emptyDiv12', 'children')
+)
+def update_bar_chart(children):
+    global data
+    values = pd.DataFrame(data)
+
+    values['Timestamp'] = pd.to_datetime(values['Timestamp'])
+    values = values.groupby(pd.Grouper(key='Timestamp', freq='H'))['Class'].value_counts().reset_index(name='count')
+
+    # Buttons
+    fig = px.bar(values, x="Timestamp", y="count", color="Class", title="Traffic density", template="plotly_dark")
+    fig.update_xaxes(
+        rangeselector=dict(
+            buttons=list([
+                dict(count=1, label="1h", step="hour", stepmode="backward"),
+                dict(count=24, label="24h", step="hour", stepmode="backward"),
+                dict(count=7, label="1w", step="day", stepmode="backward"),
+                dict(step="all")
+            ])
+        )
+    )
+    fig.update_xaxes(rangeselector_bgcolor="#31302F")
+
+    fig.update_layout(
+        paper_bgcolor="#1E1E1E",
+        autosize=False,        
+        font=dict(
+            color="White"
+        )
+    )
+    return fig
+
+########
+# Modals
+########
+
+# SETTINGS MODAL
+@app.callback(
+    Output("settingsModal", "is_open"),
+    [Input("open-settingsModal", "n_clicks"), Input("SettingsModalClose", "n_clicks")],
+    [State("settingsModal", "is_open")],
+)
+def toggle_modal(n_open, n_close, is_open):
+    if n_open or n_close:
+        return not is_open
+    return is_open
+
+# URL INPUT
+@app.callback(
+    Output('emptyDiv7', 'children'),    
+    Input("urlInput", "value"),
+)
+def update_URLoutput(input1):
+    if len(input1) > 10 and ('https://youtu.be' in input1 or 'rtsp://' in input1) and os.getenv('CAM_URL') != input1:        
+
+        os.environ['CAM_URL'] = input1
+        dotenv.set_key(dotenv_file, 'CAM_URL', os.environ['CAM_URL'])
+
+# DB SERVER INPUT
+@app.callback(
+    Output('emptyDiv8', 'children'),    
+    Input("serverInput", "value"),
+)
+def update_ServerOutput(input1):
+    if len(input1) > 5 and os.getenv('DB_SERVER') != input1:        
+
+        os.environ['DB_SERVER'] = input1        
+        dotenv.set_key(dotenv_file, 'DB_SERVER', os.environ['DB_SERVER'])
+
+# DB NAME INPUT
+@app.callback(
+    Output('emptyDiv9', 'children'),    
+    Input("nameInput", "value"),
+)
+def update_DatabaseOutput(input1):
+    if len(input1) > 5 and os.getenv('DB_DATABASE') != input1:        
+
+        os.environ['DB_DATABASE'] = input1        
+        dotenv.set_key(dotenv_file, 'DB_DATABASE', os.environ['DB_DATABASE'])
+
+# DB Username INPUT
+@app.callback(
+    Output('emptyDiv10', 'children'),    
+    Input("usernameInput", "value"),
+)
+def update_UsernameOutput(input1):
+    if len(input1) > 2 and os.getenv('DB_USERNAME') != input1:        
+
+        os.environ['DB_USERNAME'] = input1        
+        dotenv.set_key(dotenv_file, 'DB_USERNAME', os.environ['DB_USERNAME'])
+
+# DB Password INPUT
+@app.callback(
+    Output('emptyDiv11', 'children'),    
+    Input("passwordInput", "value"),
+)
+def update_UsernameOutput(input1):
+    if len(input1) > 2 and os.getenv('DB_PASSWORD') != input1:        
+
+        os.environ['DB_PASSWORD'] = input1        
+        dotenv.set_key(dotenv_file, 'DB_PASSWORD', os.environ['DB_PASSWORD'])
+
+## POLYGON MODAL
+@app.callback(
+    Output("polygonModal", "is_open"),
+    [Input("open-polygonModal", "n_clicks"), Input("PolygonModalClose", "n_clicks")],
+    [State("polygonModal", "is_open")],
+)
+def toggle_modal(n_open, n_close, is_open):
+    if n_open or n_close:
+        return not is_open
+    return is_open
+
+def path_to_indices(path):
+    """From SVG path to numpy array of coordinates, each row being a (row, col) point
+    """
+    indices_str = [
+        el.replace("M", "").replace("Z", "").split(",") for el in path.split("L")
+    ]
+    return np.rint(np.array(indices_str, dtype=float)).astype(np.int)
+
+# POLYGON ANNOTATIONS
+@app.callback(
+    Output("annotations-prePoly", "children"),
+    Input("fig-poly", "relayoutData"),
+    Input('areaInput', 'value'),
+    prevent_initial_call=True,
+)
+def on_new_annotation(relayout_data, areaName):
+    if len(areaName) > 0:
+        names = areaName.replace(' ', '')
+        names = names.split(',')
+        areas = {}
+        for key in relayout_data:
+            if "shapes" in key:
+                for i, shape in enumerate(relayout_data['shapes']):
+                    data =  tuple(map(tuple, path_to_indices(shape['path'])))
+                    data = [(int(x), int(y)) for x, y in data]
+                    areas[names[i]] = list(data)
+
+        if len(areas) > 0:
+            getStore().update(areas=areas)
+
+    return dash.no_update
+
+# Area Clear
+@app.callback(
+    Output('emptyDiv14', 'children'),
+    Input('PolygonModalClear', 'n_clicks'),
+    State('PolygonModalClear', 'value')
+)
+def clear_area(n_clicks, value):
+    if n_clicks is None:
+        raise dash.exceptions.PreventUpdate
+
+    getStore().update(areas={})
+
+# Area Clear alert
+@app.callback(
+    Output("area-clr", "is_open"),
+    [Input("PolygonModalClear", "n_clicks")],
+    [State("area-clr", "is_open")],
+)
+def toggle_alert(n, is_open):
+    if n:
+        return not is_open
+    return is_open   
+
+# MASK MODAL
+@app.callback(
+    Output("maskModal", "is_open"),
+    [Input("open-maskModal", "n_clicks"), Input("MaskModalClose", "n_clicks")],
+    [State("maskModal", "is_open")],
+)
+def toggle_modal(n_open, n_close, is_open):
+    if n_open or n_close:
+        return not is_open
+    return is_open
+
+# MASK ANNOTATIONS
+@app.callback(
+    Output("annotations-preMask", "children"),
+    Input("fig-mask", "relayoutData"),
+    prevent_initial_call=True,
+)
+def on_new_annotation(relayout_data):
+    mask = {}
+    for key in relayout_data:
+        if "shapes" in key:
+            for i, shape in enumerate(relayout_data['shapes']):
+                data =  tuple(map(tuple, path_to_indices(shape['path'])))
+                data = [(int(x), int(y)) for x, y in data]
+                mask[i] = data
+
+    if len(mask) > 0:
+        getStore().update(mask=mask)
+
+    return dash.no_update
+
+
+# Mask Clear
+@app.callback(
+    Output('emptyDiv13', 'children'),
+    Input('MaskModalClear', 'n_clicks'),
+    State('MaskModalClear', 'value')
+)
+def clear_mask(n_clicks, value):
+    if n_clicks is None:
+        raise dash.exceptions.PreventUpdate
+
+    getStore().update(mask={})
+
+# Mask Clear alert
+@app.callback(
+    Output("mask-clr", "is_open"),
+    [Input("MaskModalClear", "n_clicks")],
+    [State("mask-clr", "is_open")],
+)
+def toggle_alert(n, is_open):
+    if n:
+        return not is_open
+    return is_open
+
+# LINES MODAL
+@app.callback(
+    Output("linesModal", "is_open"),
+    [Input("open-linesModal", "n_clicks"), Input("LinesModalClose", "n_clicks")],
+    [State("linesModal", "is_open")],
+)
+def toggle_modal(n_open, n_close, is_open):
+    if n_open or n_close:
+        return not is_open
+    return is_open
+
+# LINE ANNOTATIONS
+@app.callback(
+    Output("annotations-preLines", "children"),
+    Input("fig-lines", "relayoutData"),
+    Input('lineInput', 'value'),
+    prevent_initial_call=True,
+)
+def on_new_annotation(relayout_data, lineName):
+    if len(lineName) > 0:
+        names = lineName.replace(' ', '')
+        names = names.split(',')
+        lines = {}
+        for key in relayout_data:
+            if "shapes" in key:
+                # Lines keep the direction they were drawn in
+                shapes = [shape for shape in relayout_data['shapes'] if shape['type'] == 'line']
+                for name, shape in zip(names, shapes):
+                    lines[name] = [(int(round(shape['x0'])), int(round(shape['y0']))),
+                                   (int(round(shape['x1'])), int(round(shape['y1'])))]
+
+        if len(lines) > 0:
+            getStore().update(lines=lines)
+
+    return dash.no_update
+
+# Lines Clear
+@app.callback(
+    Output('emptyDiv15', 'children'),
+    Input('LinesModalClear', 'n_clicks'),
+    State('LinesModalClear', 'value')
+)
+def clear_lines(n_clicks, value):
+    if n_clicks is None:
+        raise dash.exceptions.PreventUpdate
+
+    getStore().update(lines={})
+
+# Lines Clear alert
+@app.callback(
+    Output("lines-clr", "is_open"),
+    [Input("LinesModalClear", "n_clicks")],
+    [State("lines-clr", "is_open")],
+)
+def toggle_alert(n, is_open):
+    if n:
+        return not is_open
+    return is_open
+
+
+#####################
+# Info and statistics
+#####################
+
+# FPS Counter
+@app.callback(
+  Output('fpsCounter','children'),
+  [Input('interval-updating-oneSec','n_intervals')],
+  [State('fpsCounter','children')]
+)
+def updateFPSCounter(n_intervals,old_logs):
+    global FPS
+    return round(FPS)
+ 
+
+# Traffic Flow
+@app.callback(
+  Output('trafficFlow','children'),
+  [Input('interval-updating-fiveSec','n_intervals')],
+  [State('trafficFlow','children')]
+)
+def updateTrafficFlow(n_intervals,old_logs):    
+    global data
+    values = pd.DataFrame(data)
+    values['Timestamp'] = pd.to_datetime(values['Timestamp'])
+
+    # Number of vehicles from last hour
+    flow = values.groupby(pd.Grouper(key='Timestamp', freq='H'))['VehicleID'].count().iloc[-1]
+
+    # Return vehicles per minute
+    return  round(float(flow / 60),1)
+
+
+# Defined detection areas
+@app.callback(
+  Output('definedAreas','children'),
+  [Input('areaInput', 'value')],
+  [Input('PolygonModalClear', 'n_clicks')],
+  [Input('lineInput', 'value')],
+  [Input('LinesModalClear', 'n_clicks')],
+  [State('definedAreas','children')]
+)
+def definedAreas(n_clicks, value, lines, linesClicks, children):
+    return getRoutesLen()
+
+# Busiest entrance
+@app.callback(
+  Output('busiestEntrance','children'),
+  [Input('interval-updating-fiveSec','n_intervals')],
+  [State('definedAreas','children')]
+)
+def updateEntrance(n_intervals,children):    
+    global data
+    values = pd.DataFrame(data)
+    # First group rows by hour, then calculate most used intersection entrance
+    values['Timestamp'] = pd.to_datetime(values['Timestamp'])
+    interEntrance = values.groupby(pd.Grouper(key='Timestamp', freq='H'))['IntersectionOrigin'].value_counts().tail(getRoutesLen()).idxmax()[1]
+
+    return interEntrance
+
+# Busiest Exit
+@app.callback(
+  Output('busiestExit','children'),
+  [Input('interval-updating-fiveSec','n_intervals')],
+  [State('busiestExit','children')]
+)
+def updateExit(n_intervals,children):    
+    global data
+    values = pd.DataFrame(data)
+     # First group rows by hour, then calculate most used intersection exit
+    values['Timestamp'] = pd.to_datetime(values['Timestamp'])
+    interExit = values.groupby(pd.Grouper(key='Timestamp', freq='H'))['IntersectionExit'].value_counts().tail(getRoutesLen()).idxmax()[1]
+
+    return  interExit
+
+
+"""
+Loads the data of the current day and runs the dashboard server.
+"""
+def main():
+    global data, points, dotenv_file
+    dotenv_file = dotenv.find_dotenv()
+    dotenv.load_dotenv(dotenv_file)
+
+    data = [] #pd.DataFrame(columns=['VehicleID', 'Class', 'IntersectionOrigin', 'IntersectionExit', 'Timestamp'])
+
+    if USE_DB:
+        data = fetchToday()
+    else:
+        data = [] #pd.DataFrame(columns=['VehicleID', 'Class', 'IntersectionOrigin', 'IntersectionExit', 'Timestamp'])
+
+    points = [] #pd.DataFrame(columns=['X_point', 'Y_point', 'VehicleID'])
+
+    # Counting-only node, nobody opens the stream to start the processing
+    if getConfig().headless:
+        startPipeline()
+
+    # Possible to add host and port for specific adress -> app.run_server(debug=False,host=127.0.0.1, port=9000)
+    app.run_server(debug=False)
+
+
+if __name__ == '__main__':
+    main()
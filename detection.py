@@ -1,122 +1,303 @@
 import os
 import cv2
-import json
+import time
 import numpy as np
 import matplotlib.pyplot as plt
 from datetime import datetime
 
 from application.deep_sort.detection import Detection
-from database import getLastID
-from utils import initYOLO, initDeepSort
+from config import getConfig
+from motion import MotionGate, hasAreaMotion
+from polygons import getStore
+from preprocess import Preprocessor
+from postprocess import getAllowedIDs, parseDetections
+from scheduler import InputSizeController, getInputSizes
+from detectors import initDetector
+from utils import WIDTH, HEIGHT, initEncoder, initTracker
 
 vID = None
-mask = None
-routes = None
-model, class_names = initYOLO()
-tracker, encoder = initDeepSort()
 
+ROI_MARGIN = 32
 
-def getPolygons():
-    global mask, routes
-    try:
-        with open('polygons.json', 'r') as f:
-            polygons = json.load(f)
-
-            return polygons['mask'], polygons['areas']
-    except:
-        print('Error while reading polygons file!')
-        exit()
+# Models are loaded on first use, so a pipeline stage only loads the one it needs
+detector, class_names = None, None
+preprocessor, sizeController = None, None
+tracker, encoder = None, None
+encodeTime = 0
+motionGate = None
 
 
 def getRoutesLen():
-    global mask, routes
-    if routes is None:
-        mask, routes = getPolygons()
+    return len(getStore().get().names)
 
-    return len(routes)
+
+"""
+Returns the appearance encoding time of the last tracked frame in seconds.
+"""
+def getEncodeTime():
+    return encodeTime
 
 
 # initialize color map
 cmap = plt.get_cmap('tab20b')
 colors = [cmap(i)[:3] for i in np.linspace(0, 1, 20)]
 
+"""
+Returns True if the detection areas changed since the last detection.
+Always True unless MOTION_GATE is enabled.
+"""
+
+
+def hasMotion(frame):
+    global motionGate
+
+    if motionGate is None:
+        motionGate = MotionGate(threshold=float(os.getenv('MOTION_THRESHOLD', 0.002)))
+
+    return hasAreaMotion(motionGate, getStore(), frame)
+
+
+"""
+Returns the bounding box (x, y, w, h) of all detection areas plus a margin in
+the coordinates of a network input of the given size, aligned to the 32 px
+stride of YOLO. None if ROI detection is disabled (DETECT_ROI) or there are
+no areas.
+"""
+
+
+def getROI(routesList, margin=ROI_MARGIN, size=(WIDTH, HEIGHT)):
+    routesList = [r for r in routesList if r is not None and len(r) > 0]
+    if not getConfig().detectROI or len(routesList) == 0:
+        return None
+
+    points = np.concatenate([np.array(poly).reshape(-1, 2) for r in routesList for poly in r.values()])
+    points = points * (size[0] / WIDTH, size[1] / HEIGHT)
+    x0, y0 = np.maximum(points.min(axis=0) - margin, 0).astype(int)
+    x1, y1 = np.minimum(points.max(axis=0) + margin, size)
+
+    w = min(size[0], int(np.ceil((x1 - x0) / 32) * 32))
+    h = min(size[1], int(np.ceil((y1 - y0) / 32) * 32))
+
+    return int(min(x0, size[0] - w)), int(min(y0, size[1] - h)), w, h
+
+
 """
 Detects vehicles in a frame using YOLOv4 model.
 """
 
 
 def detectVehicles(frame, ALLOWED_CLASSES):
-    global model, class_names, tracker, encoder, vID, mask, routes
+    polygons = getStore().get()
+
+    return detectBatch([frame], [polygons.maskImage], ALLOWED_CLASSES, [polygons.regions])[0]
+
+
+"""
+Detects vehicles in frames from several cameras with a single batched
+forward pass of the detector picked by initDetector. Masks are the compiled
+mask images of the polygon stores. Returns a (classes, confidences, boxes)
+tuple per frame. With regions and DETECT_ROI the network only sees their
+bounding box, if the detector takes a variable input size.
+"""
 
-    if mask is None or routes is None or os.getenv('UPDATE_POLYGONS') == 'True':
-        mask, routes = getPolygons()
-        os.environ['UPDATE_POLYGONS'] = 'False'
 
-        # Apply mask
-    frame_masked = frame.copy()
-    if len(mask) > 0:
-        for name, poly in mask.items():
-            cv2.fillPoly(frame_masked, [np.array(poly, np.int32)], (0, 0, 0))
+def detectBatch(frames, masks, ALLOWED_CLASSES, regions=None):
+    global detector, class_names, preprocessor, sizeController
+
+    if detector is None:
+        detector, class_names = initDetector()
+        sizeController = InputSizeController(getInputSizes(detector.size) if detector.resizable else [detector.size])
+        if os.getenv('DETECTOR_SIZE', 'auto') == 'auto':
+            detector.setSize(sizeController.calibrate(benchmarkSize))
+        preprocessor = Preprocessor(detector.size)
+
+    startTime = time.time()
+    roi = getROI(regions, size=detector.size) if regions is not None and detector.dynamic else None
 
     # OBJECT DETECTION
-    classes, confidences, boxes = model.detect(
-        frame_masked, confThreshold=float(os.getenv('CONFIDENCE_THRESHOLD')), nmsThreshold=0.4)
+    outs = detector.forward(preprocessor.prepare(frames, masks, roi))
+    confThreshold = getConfig().confidenceThreshold
+    allowed = getAllowedIDs(class_names, ALLOWED_CLASSES)
+
+    results = [parseDetections(out, frame.shape, detector.size, roi, allowed, confThreshold, class_names)
+               for frame, out in zip(frames, outs)]
+
+    # Smaller input size when the host can't keep up with LATENCY_TARGET, which is per frame
+    size = sizeController.update((time.time() - startTime) / len(frames))
+    if size is not None:
+        print('Detector input size changed to {0}x{1}'.format(size[0], size[1]))
+        detector.setSize(size)
+        preprocessor = Preprocessor(size)
+
+    return results
+
+
+"""
+Returns the mean forward pass latency [s] of the detector at the given input size.
+"""
+
+
+def benchmarkSize(size, runs=5):
+    detector.setSize(size)
+    blob = np.zeros((1, 3, size[1], size[0]), np.float32)
+    detector.forward(blob)
 
-    # Boxes filtering - Passsing only specific classes to tracker
-    filtered_boxes = []
-    filtered_classes = []
-    filtered_confidences = []
-    for i in range(len(boxes)):
-        if class_names[int(classes[i])] in ALLOWED_CLASSES:
-            filtered_boxes.append(boxes[i])
-            filtered_classes.append(class_names[int(classes[i])])
-            filtered_confidences.append(confidences[i])
-    filtered_classes = np.array(filtered_classes)  # ?
-    filtered_boxes = np.array(filtered_boxes)
-    filtered_confidences = np.array(filtered_confidences)
+    startTime = time.time()
+    for _ in range(runs):
+        detector.forward(blob)
 
-    return filtered_classes, confidences, filtered_boxes
+    return (time.time() - startTime) / runs
 
 
 """
 Tracks vehicles based on data from detectVehicle function.
+If boxes is None (static frame), the tracks are only propagated.
+Counted vehicles get the given timestamp, the current time by default.
+The overlay is drawn only with draw and outside of the HEADLESS mode.
+"""
+
+
+def trackVehicles(frame, data, points, classes, confidences, boxes, timestamp=None, draw=True):
+    global tracker
+
+    if tracker is None:
+        tracker = initTracker()
+
+    return updateTracks(tracker, getStore(), frame, data, points, classes, confidences, boxes, timestamp, draw)
+
+
+"""
+Returns the index of the detection area at each (x, y) point, -1 outside
+the areas or the label image.
+"""
+
+
+def getZones(labels, centers):
+    zones = np.full(len(centers), -1, np.int16)
+    if len(centers) == 0:
+        return zones
+
+    x, y = centers[:, 0], centers[:, 1]
+    inside = (x >= 0) & (x < labels.shape[1]) & (y >= 0) & (y < labels.shape[0])
+    zones[inside] = labels[y[inside], x[inside]]
+
+    return zones
+
+
+"""
+Returns the index of the first directed line (L, 2, 2) crossed by each
+segment from starts to ends (N, 2), -1 if none. A line is crossed when the
+segment goes from its left to its right side, looking from the first to
+the second point of the line in image coordinates.
 """
 
 
-def trackVehicles(frame, data, points, classes, confidences, boxes):
-    global vID
-    features = encoder(frame, boxes)
+def getCrossings(lines, starts, ends):
+    crossings = np.full(len(starts), -1, np.int16)
+    if len(starts) == 0 or len(lines) == 0:
+        return crossings
+
+    a, b = lines[np.newaxis, :, 0], lines[np.newaxis, :, 1]
+    p, q = starts[:, np.newaxis], ends[:, np.newaxis]
+
+    def cross(u, v):
+        return u[..., 0] * v[..., 1] - u[..., 1] * v[..., 0]
+
+    # Sides of the segment ends to the lines and of the line ends to the segments, (N, L)
+    startSide, endSide = cross(b - a, p - a), cross(b - a, q - a)
+    aSide, bSide = cross(q - p, a - p), cross(q - p, b - p)
+    crossed = (startSide < 0) & (endSide >= 0) & (aSide * bSide <= 0)
 
-    # creating Detection objs for tracking
-    detections = [Detection(bbox, score, class_name, feature) for bbox, score,
-    class_name, feature in zip(boxes, confidences, classes, features)]
+    hit = crossed.any(axis=1)
+    crossings[hit] = crossed[hit].argmax(axis=1)
 
-    # Call the tracker
-    tracker.predict()
-    tracker.update(detections)
+    return crossings
+
+
+"""
+Returns the area or line name recorded for a counted vehicle, prefixed with
+the camera name in the multi-camera mode (i.e. "Camera1: Sever"), so areas
+with the same name on different cameras stay apart.
+"""
 
-    for track in tracker.tracks:
-        if not track.is_confirmed() or track.time_since_update > 1 or track.counted:
-            continue
 
-        box = track.to_tlbr().astype('int32')
-        left, top, width, height = box
+def getZoneName(camera, name):
+    if camera is None:
+        return name
+    if name is None:
+        return camera
 
+    return '{0}: {1}'.format(camera, name)
+
+
+"""
+Runs the given tracker with the detection areas of its polygon store, used
+for every camera. Vehicle IDs are shared by all cameras, with camera the
+counted vehicles get its name in their origin and exit.
+"""
+
+
+def updateTracks(tracker, polygons, frame, data, points, classes, confidences, boxes, timestamp=None, draw=True,
+                 camera=None):
+    global vID, encoder, encodeTime
+
+    polygons = polygons.get()
+    routes, lines, names = polygons.areas, polygons.lines, polygons.names
+    config = getConfig()
+    draw = draw and not config.headless
+
+    if encoder is None:
+        encoder = initEncoder()
+
+    if timestamp is None:
+        timestamp = datetime.now()
+
+    if boxes is None:
+        encodeTime = 0
+        tracker.predict()
+    else:
+        startTime = time.time()
+        features = encoder(frame, boxes)
+        encodeTime = time.time() - startTime
+
+        # creating Detection objs for tracking
+        detections = [Detection(bbox, score, class_name, feature) for bbox, score,
+        class_name, feature in zip(boxes, confidences, classes, features)]
+
+        # Call the tracker
+        tracker.predict()
+        tracker.update(detections)
+
+    tracks = [track for track in tracker.tracks
+              if track.is_confirmed() and track.time_since_update <= 1 and not track.counted]
+
+    # Center points of the objs and the counting lines they crossed or detection areas they are in
+    trackBoxes = np.array([track.to_tlbr() for track in tracks]).astype('int32').reshape(-1, 4)
+    centers = (trackBoxes[:, :2] + trackBoxes[:, 2:]) // 2
+    if len(lines) > 0:
+        previous = np.array([track.points[-1] if len(track.points) > 0 else (np.nan, np.nan) for track in tracks],
+                            np.float32).reshape(-1, 2)
+        zones = getCrossings(polygons.segments, previous, centers.astype(np.float32))
+    else:
+        # Where areas overlap, the origin of a track gives way to the next listed area as its exit
+        zones = getZones(polygons.labels, centers)
+        nextZones = getZones(polygons.nextLabels, centers)
+        origins = np.array([names.index(track.origin) if track.origin in names else -1 for track in tracks], np.int16)
+        zones = np.where((zones == origins) & (nextZones >= 0), nextZones, zones)
+
+    for track, (cx, cy), zone in zip(tracks, centers.tolist(), zones.tolist()):
         color = colors[int(track.track_id) % len(colors)]
         color = [i * 255 for i in color]
 
-        # Center point of the obj
-        cx = int((left + width) / 2)
-        cy = int((top + height) / 2)
-
         # Center of the object
-        cv2.circle(frame, (cx, cy), 5, color, -1)
+        if draw:
+            cv2.circle(frame, (cx, cy), 5, color, -1)
 
-        cv2.putText(frame, track.get_class().capitalize(), (cx - 10, cy - 20),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+            cv2.putText(frame, track.get_class().capitalize(), (cx - 10, cy - 20),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
 
         # Tracking line - last 10 points
-        if os.environ['SHOW_TRACKS'] == 'True' and len(track.points) > 3:
+        if draw and config.showTracks and len(track.points) > 3:
             pts = []
             i = 0
             while len(pts) < 10 and i < len(track.points):
@@ -132,19 +313,15 @@ def trackVehicles(frame, data, points, classes, confidences, boxes):
             # Save obj position in current frame
             track.points.append((cx, cy))
 
-            # Using detection areas
-            if len(routes) > 0:
-                for name, poly in routes.items():
-
-                    # Test if obj is in polygon
-                    result = cv2.pointPolygonTest(
-                        np.array(poly, np.int32), (int(cx), int(cy)), False)
+            # Using counting lines or detection areas, a single line counts on the first crossing
+            if len(names) > 0:
+                if zone >= 0:
+                    name = names[zone]
 
-                    if result >= 0 and track.origin is None:
+                    if track.origin is None:
                         track.origin = name
-                        break
 
-                    if result >= 0 and track.origin is not None and name != track.origin:
+                    if name != track.origin or len(lines) == 1:
                         track.exit = name
 
                         # Manually increasing VehicleID
@@ -160,6 +337,8 @@ def trackVehicles(frame, data, points, classes, confidences, boxes):
                             if len(data) != 0:
                                 vID = max(d['VehicleID'] for d in data) + 1
                             else:
+                                # Database is only needed when no vehicle was counted yet
+                                from database import getLastID
                                 vID = getLastID() + 1
                         else:
                             vID += 1
@@ -168,9 +347,9 @@ def trackVehicles(frame, data, points, classes, confidences, boxes):
                         new_data = {
                             'VehicleID': vID,
                             'Class': track.get_class(),
-                            'IntersectionOrigin': track.origin,
-                            'IntersectionExit': track.exit,
-                            'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                            'IntersectionOrigin': getZoneName(camera, track.origin),
+                            'IntersectionExit': getZoneName(camera, track.exit),
+                            'Timestamp': timestamp.strftime("%Y-%m-%d %H:%M:%S")
                         }
                         data.append(new_data)
                         #data = data.append(
@@ -195,7 +374,6 @@ def trackVehicles(frame, data, points, classes, confidences, boxes):
                         print('{0} #{1} came from {2} and went to {3}. Pos. points: {4}'.format(
                             track.get_class().capitalize(), str(track.track_id), track.origin, track.exit,
                             track.points))
-                        break
 
             # Not using detection areas          
             else:
@@ -211,6 +389,8 @@ def trackVehicles(frame, data, points, classes, confidences, boxes):
                     if len(data) != 0:
                         vID = max(d['VehicleID'] for d in data) + 1
                     else:
+                        # Database is only needed when no vehicle was counted yet
+                        from database import getLastID
                         vID = getLastID() + 1
                 else:
                     vID += 1
@@ -221,9 +401,9 @@ def trackVehicles(frame, data, points, classes, confidences, boxes):
                     new_data = {
                         'VehicleID': vID,
                         'Class': track.get_class(),
-                        'IntersectionOrigin': track.origin,
-                        'IntersectionExit': track.exit,
-                        'Timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                        'IntersectionOrigin': getZoneName(camera, track.origin),
+                        'IntersectionExit': getZoneName(camera, track.exit),
+                        'Timestamp': timestamp.strftime("%Y-%m-%d %H:%M:%S")
                     }
                     data.append(new_data)
 
@@ -242,10 +422,7 @@ def trackVehicles(frame, data, points, classes, confidences, boxes):
                     track.counted = True
 
     # Show polygons
-    if os.getenv('SHOW_POLYGONS') == 'True':
-        if routes is not None:
-            for poly in routes:
-                cv2.polylines(frame, [np.array(routes[poly], np.int32)],
-                              True, (255, 0, 255), 2)
+    if draw and config.showPolygons:
+        polygons.drawOverlay(frame)
 
     return frame, data, points
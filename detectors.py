@@ -0,0 +1,162 @@
+import os
+import numpy as np
+
+from utils import WIDTH, HEIGHT, initNet, getClassNames
+
+
+MODELS_PATH = './application/resources'
+
+"""
+YOLO detector running on OpenCV DNN (CUDA if available). Darknet models take
+any input size divisible by 32, so the detection can be limited to a roi.
+All detectors share the same contract: forward() takes the (N, 3, h, w)
+blob from Preprocessor and returns the raw YOLO rows (N, rows, 5 + classes)
+with center based boxes relative to the input and class scores already
+multiplied by the objectness.
+"""
+class OpenCVDetector():
+    dynamic = True
+    resizable = True
+
+    def __init__(self, model, size):
+        self.size = size
+        self.net, _ = initNet(model)
+        self.outputs = self.net.getUnconnectedOutLayersNames()
+
+    def setSize(self, size):
+        self.size = size
+
+    def forward(self, blob):
+        self.net.setInput(blob)
+        outs = self.net.forward(self.outputs)
+
+        # Output of each YOLO layer is (batch, rows, 85), the batch axis is dropped for a single image
+        return np.concatenate([out.reshape(len(blob), -1, out.shape[-1]) for out in outs], axis=1)
+
+
+"""
+YOLO detector running an ONNX export of the model on ONNX Runtime CPU. The
+roi is only used when the model was exported with dynamic height and width.
+Exports with a static batch size run the frames in batches of that size.
+"""
+class OnnxDetector():
+    def __init__(self, model, size):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(os.path.join(MODELS_PATH, model + '.onnx'), options,
+                                            providers=['CPUExecutionProvider'])
+        self.input = self.session.get_inputs()[0]
+        self.batch = self.input.shape[0] if isinstance(self.input.shape[0], int) else None
+        self.dynamic = not all(isinstance(dim, int) for dim in self.input.shape[2:])
+        self.resizable = self.dynamic
+        self.size = size if self.dynamic else (self.input.shape[3], self.input.shape[2])
+
+    def setSize(self, size):
+        if self.resizable:
+            self.size = size
+
+    # Returns the model inputs for the blob, exported models take RGB input
+    def getInputs(self, blob):
+        return {self.input.name: np.ascontiguousarray(blob[:, ::-1])}
+
+    def forward(self, blob):
+        if self.batch is None or len(blob) == self.batch:
+            return toRows(self.session.run(None, self.getInputs(blob)), len(blob), self.size)
+
+        # The last batch is padded to the exported size
+        rows = []
+        for start in range(0, len(blob), self.batch):
+            part = blob[start:start + self.batch]
+            padding = np.zeros((self.batch - len(part),) + part.shape[1:], part.dtype)
+            outs = self.session.run(None, self.getInputs(np.concatenate((part, padding))))
+            rows.append(toRows(outs, self.batch, self.size)[:len(part)])
+
+        return np.concatenate(rows)
+
+
+"""
+YOLO detector running an OpenVINO IR model (.xml + .bin) on the CPU. The
+model is reshaped to the input size with a dynamic batch for several cameras.
+"""
+class OpenVINODetector():
+    dynamic = False
+    resizable = True
+
+    def __init__(self, model, size):
+        from openvino.runtime import Core
+
+        self.core = Core()
+        self.network = self.core.read_model(os.path.join(MODELS_PATH, model + '.xml'))
+        self.setSize(size)
+
+    # Input size changes recompile the model
+    def setSize(self, size):
+        self.size = size
+        self.network.reshape([-1, 3, size[1], size[0]])
+        self.model = self.core.compile_model(self.network, 'CPU', {'PERFORMANCE_HINT': 'LATENCY'})
+
+    def forward(self, blob):
+        # Exported models take RGB input
+        results = self.model(np.ascontiguousarray(blob[:, ::-1]))
+
+        return toRows([results[output] for output in self.model.outputs], len(blob), self.size)
+
+
+"""
+Converts the outputs of an exported model of the given input size to the
+YOLO rows. Takes either the single (N, rows, 5 + classes) output of YOLOv5
+style exports, with center based boxes in input pixels and class scores not
+multiplied by the objectness, or the (boxes, confidences) pair of YOLOv4
+exports with corner based boxes (x1, y1, x2, y2) relative to the input and
+final confidences.
+"""
+def toRows(outs, batch, size):
+    if len(outs) == 1:
+        rows = outs[0].reshape(batch, -1, outs[0].shape[-1]).astype(np.float32)
+        rows[..., :4] /= np.array((size[0], size[1], size[0], size[1]), np.float32)
+        rows[..., 5:] *= rows[..., 4:5]
+        return rows
+    if len(outs) != 2:
+        raise ValueError('Unsupported model outputs, expected (rows) or (boxes, confidences), got {0}'.format(len(outs)))
+
+    boxes = outs[0].reshape(batch, -1, 4)
+    confidences = outs[1].reshape(batch, boxes.shape[1], -1)
+
+    return np.concatenate((
+        (boxes[..., :2] + boxes[..., 2:]) / 2,
+        boxes[..., 2:] - boxes[..., :2],
+        confidences.max(axis=-1, keepdims=True),
+        confidences), axis=-1).astype(np.float32)
+
+
+BACKENDS = {'opencv': OpenCVDetector, 'onnx': OnnxDetector, 'openvino': OpenVINODetector}
+
+"""
+Returns the network input size from DETECTOR_SIZE (WIDTHxHEIGHT, divisible
+by 32). With auto the largest size is returned, the detection picks the
+actual one by a benchmark.
+"""
+def getDetectorSize():
+    size = os.getenv('DETECTOR_SIZE', 'auto')
+    if size == 'auto':
+        return WIDTH, HEIGHT
+
+    return tuple(int(value) for value in size.split('x'))
+
+
+"""
+Returns the detector picked by DETECTOR_BACKEND (opencv, onnx, openvino),
+DETECTOR_MODEL (model file name in application/resources, i.e. yolov4 or
+yolov4-tiny) and DETECTOR_SIZE, and the class names.
+"""
+def initDetector():
+    backend = os.getenv('DETECTOR_BACKEND', 'opencv')
+    model = os.getenv('DETECTOR_MODEL', 'yolov4')
+    size = getDetectorSize()
+
+    if backend not in BACKENDS:
+        raise ValueError('Unknown DETECTOR_BACKEND {0}, use one of {1}'.format(backend, ', '.join(BACKENDS)))
+
+    return BACKENDS[backend](model, size), getClassNames()
@@ -10,14 +10,14 @@ from utils import getTitle
 
 
 title = getTitle()
-def getBG():
+def getBG(dragmode="drawclosedpath"):
     path = './application/resources/canvas_bg.png'
     # For creating detection polygons and mask
     if os.path.exists(path):
         img = cv2.imread(path)
         img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         fig = px.imshow(img)
-        fig.update_layout(coloraxis_showscale=False, paper_bgcolor='#1e1e1e', autosize=True, dragmode="drawclosedpath")
+        fig.update_layout(coloraxis_showscale=False, paper_bgcolor='#1e1e1e', autosize=True, dragmode=dragmode)
         fig.update_xaxes(showticklabels=False)
         fig.update_yaxes(showticklabels=False)
         fig.update_layout(
@@ -245,6 +245,57 @@ def layout():
                 size="lg",
                 is_open=False,                
             ),
+            # Lines modal
+            dbc.Modal(
+                [
+                    dbc.ModalHeader(dbc.ModalTitle("Create counting lines"), close_button=False),
+                    dbc.ModalBody(children=[
+                        # LINE NAME
+                        html.Div(children=[
+                            html.Div(children=[
+                                html.P('Line Name', style={'textAlign':'right', 'marginRight':'2rem'}),
+                                ],
+                                style={'display': 'inline-block', 'width': '25%', 'horizontalAlign': 'middle'}
+                            ),
+                            html.Div(children=[
+                                html.P('Enter names for the counting lines separated by commas (i.e. name1, name2, name3).', style={'width':'85%'}),
+                                html.P('Vehicles are counted when they cross a line from its left to its right side, looking from the point where the line was started. '
+                                       'When lines are defined, they are used for counting instead of the detection areas.', style={'width':'85%'}),
+                                dcc.Input(
+                                    placeholder='Enter line names...',
+                                    type='text',
+                                    id='lineInput',
+                                    value='',
+                                    debounce=True,
+                                    style={'width': '85%', 'height': '75%'}
+                                ),
+                                ],
+                                style={'display': 'flex', 'justifyContent': 'center', 'display': 'inline-block', 'width': '75%'}
+                            ),
+                        ],
+                        ),
+                        # CANVAS
+                        dcc.Graph(id="fig-lines", figure=getBG("drawline"), config=config, style={'width': '100%', 'height': '100%'}),
+                        html.Pre(id="annotations-preLines"),
+                        dbc.Alert(
+                            "Counting lines cleared.",
+                            id="lines-clr",
+                            is_open=False,
+                            duration=2000,
+                            color="success"
+                        ),
+                    ]),
+                    dbc.ModalFooter(children=[
+                        html.Button("Clear Lines", id="LinesModalClear",style={'justify': 'right', 'marginTop': '15px', 'color':'red'}),
+                        html.Button("Done", id="LinesModalClose",style={'justify': 'right', 'marginTop': '15px'}),
+                        ],
+                        style={'display': 'flex', 'justifyContent': 'middle'}
+                    ),
+                ],
+                id="linesModal",
+                size="lg",
+                is_open=False,
+            ),
             html.Div(
                 className="row",
                 children=[
@@ -276,6 +327,12 @@ def layout():
                                             html.Button("Mask", id="open-maskModal",style={'marginTop': '10px', 'width': '15rem'}),                                           
                                         ],
                                         style = {'horizontalAlign': 'middle'}
+                                    ),
+                                    html.Div(
+                                        children=[
+                                            html.Button("Counting Lines", id="open-linesModal",style={'marginTop': '10px', 'width': '15rem'}),
+                                        ],
+                                        style = {'horizontalAlign': 'middle'}
                                     ),                                                                                                
                                 ],
                                 style={'textAlign': 'center'}
@@ -386,7 +443,8 @@ def layout():
                                     html.Div(id='emptyDiv11'),
                                     html.Div(id='emptyDiv12'),   
                                     html.Div(id='emptyDiv13'),    
-                                    html.Div(id='emptyDiv14'),                                                  
+                                    html.Div(id='emptyDiv14'),
+                                    html.Div(id='emptyDiv15'),                                                  
                                 ],
                             ),
                             html.Hr(),
@@ -0,0 +1,82 @@
+import cv2
+import numpy as np
+
+from config import getConfig
+
+
+"""
+Cheap change detector used to skip YOLO on static frames. Compares a downscaled,
+blurred grayscale frame with the frame of the last detection, optionally only
+inside the detection areas. Detection is forced every maxIdle frames, so slowly
+changing scenes and standing vehicles are still picked up.
+"""
+class MotionGate():
+    def __init__(self, scale=0.125, threshold=0.002, pixelThreshold=25, maxIdle=30):
+        self.scale = scale
+        self.threshold = threshold
+        self.pixelThreshold = pixelThreshold
+        self.maxIdle = maxIdle
+
+        self.size = None
+        self.region = None
+        self.regionArea = 0
+        self.polygons = None
+        self.reference = None
+        self.idle = 0
+
+    # Limits the change detection to the given polygons, whole frame if empty
+    def setRegion(self, polygons, shape):
+        self.polygons = polygons
+        self.size = (max(1, int(shape[1] * self.scale)), max(1, int(shape[0] * self.scale)))
+        self.region = None
+        self.regionArea = self.size[0] * self.size[1]
+
+        if polygons is not None and len(polygons) > 0:
+            self.region = np.zeros((self.size[1], self.size[0]), np.uint8)
+            for poly in polygons.values():
+                cv2.fillPoly(self.region, [np.rint(np.array(poly) * self.scale).astype(np.int32)], 255)
+            self.regionArea = max(1, cv2.countNonZero(self.region))
+
+        self.reference = None
+
+    # Returns True if the frame changed enough to run the detector
+    def hasMotion(self, frame):
+        if self.size is None:
+            self.setRegion(None, frame.shape)
+
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+        if self.reference is None or self.idle >= self.maxIdle:
+            self.reference = gray
+            self.idle = 0
+            return True
+
+        diff = cv2.absdiff(gray, self.reference)
+        _, changed = cv2.threshold(diff, self.pixelThreshold, 255, cv2.THRESH_BINARY)
+        if self.region is not None:
+            changed = cv2.bitwise_and(changed, self.region)
+
+        if cv2.countNonZero(changed) / self.regionArea >= self.threshold:
+            self.reference = gray
+            self.idle = 0
+            return True
+
+        self.idle += 1
+        return False
+
+
+"""
+Returns True if the detection areas of the polygon store changed since the
+last detection, checked by the given gate. Always True unless MOTION_GATE is
+enabled.
+"""
+def hasAreaMotion(gate, store, frame):
+    if not getConfig().motionGate:
+        return True
+
+    regions = store.get().regions
+    if gate.polygons is not regions:
+        gate.setRegion(regions, frame.shape)
+
+    return gate.hasMotion(frame)
@@ -0,0 +1,39 @@
+import os
+import json
+
+from stream import VideoStream
+from motion import MotionGate, hasAreaMotion
+from polygons import getStore
+from utils import initTracker
+
+
+"""
+Single camera of the multi-camera mode. Every camera has its own stream,
+tracker (and so its own track IDs), polygons and motion gate.
+"""
+class Camera():
+    def __init__(self, name, url, polygons='polygons.json'):
+        self.name = name
+        self.polygons = getStore(polygons)
+        self.stream = VideoStream(url)
+        self.tracker = initTracker()
+        self.motionGate = MotionGate(threshold=float(os.getenv('MOTION_THRESHOLD', 0.002)))
+
+    # Checks the areas of this camera
+    def hasMotion(self, frame):
+        return hasAreaMotion(self.motionGate, self.polygons, frame)
+
+
+"""
+Returns cameras defined in the cameras file, a list of objects with
+name, url and polygons (path to the polygons file of the camera).
+"""
+def loadCameras(path='cameras.json'):
+    try:
+        with open(path, 'r') as f:
+            cameras = json.load(f)
+    except:
+        print('Error while reading cameras file!')
+        exit()
+
+    return [Camera(c['name'], c['url'], c.get('polygons', 'polygons.json')) for c in cameras]
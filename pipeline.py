@@ -0,0 +1,244 @@
+import cv2
+import time
+import queue
+import numpy as np
+import multiprocessing as mp
+from multiprocessing.shared_memory import SharedMemory
+
+from utils import WIDTH, HEIGHT
+
+
+# Version of the polygons last seen in this stage process
+polygonsVersion = None
+
+"""
+Ring of preallocated HEIGHT x WIDTH x 3 frame buffers in shared memory.
+Stages pass only slot indices and metadata over queues, the pixels stay in place.
+"""
+class SharedFrameRing():
+    def __init__(self, slots, shape=(HEIGHT, WIDTH, 3), name=None):
+        self.slots = slots
+        self.shape = shape
+        size = slots * int(np.prod(shape))
+        self.shm = SharedMemory(name=name, create=name is None, size=size)
+        self.frames = np.ndarray((slots,) + tuple(shape), dtype=np.uint8, buffer=self.shm.buf)
+
+    def __reduce__(self):
+        # Stage processes attach to the existing segment by its name
+        return (SharedFrameRing, (self.slots, self.shape, self.shm.name))
+
+    def close(self):
+        self.frames = None
+        self.shm.close()
+
+    def unlink(self):
+        self.close()
+        self.shm.unlink()
+
+
+"""
+Applies the settings sent by the Dash process to the stage config and
+reloads the polygons when the editor saved new ones. Returns the latest list
+of allowed classes.
+"""
+def applySettings(control, allowedClasses):
+    global polygonsVersion
+
+    while True:
+        try:
+            settings = control.get_nowait()
+        except queue.Empty:
+            return allowedClasses
+
+        allowedClasses = settings.pop('ALLOWED_CLASSES', allowedClasses)
+        version = settings.pop('POLYGONS_VERSION', polygonsVersion)
+        if polygonsVersion is not None and version != polygonsVersion:
+            from polygons import getStore
+            getStore().load()
+        polygonsVersion = version
+
+        from config import getConfig
+        getConfig().update(**settings)
+
+
+"""
+Capture stage. Writes the frames picked by the scheduler into a free ring slot.
+"""
+def captureStage(ring, freeSlots, output, feedback):
+    from stream import openStream, options
+    from scheduler import FrameScheduler
+
+    stream = openStream()
+    scheduler = FrameScheduler(sourceFPS=options['CAP_PROP_FPS'])
+    frameCount = 0
+    while True:
+        frame = stream.getFrame()
+        if frame is None:
+            break
+        frameCount += 1
+
+        if frameCount == 1:
+            cv2.imwrite('./application/resources/canvas_bg.png', frame)
+
+        # Latency of the slowest stage limits the pipeline throughput
+        while True:
+            try:
+                latency, detections = feedback.get_nowait()
+            except queue.Empty:
+                break
+            scheduler.update(latency, detections)
+
+        # Processing only every n-th frame, n is picked by the scheduler
+        if not scheduler.shouldProcess(stream.lastCaptured):
+            continue
+
+        slot = freeSlots.get()
+        ring.frames[slot][:] = frame
+        output.put({'slot': slot, 'frameCount': frameCount, 'stride': scheduler.stride,
+                    'skipped': stream.skipped, 'times': {}})
+
+    stream.stop()
+    output.put(None)
+
+
+"""
+Detection stage. Runs YOLO on the frame in the given slot.
+"""
+def detectStage(ring, control, input, output, allowedClasses):
+    from detection import detectVehicles, hasMotion
+
+    while True:
+        meta = input.get()
+        if meta is None:
+            break
+
+        allowedClasses = applySettings(control, allowedClasses)
+        startTime = time.time()
+        frame = ring.frames[meta['slot']]
+        if hasMotion(frame):
+            meta['detections'] = detectVehicles(frame, allowedClasses)
+        else:
+            meta['detections'] = None, None, None
+        meta['times']['detect'] = time.time() - startTime
+        output.put(meta)
+
+    output.put(None)
+
+
+"""
+Tracking stage. Runs Deep SORT, draws the overlay into the slot if any
+client is watching and sends newly counted vehicles back to the Dash process.
+"""
+def trackStage(ring, control, input, output, results, lastID, clients):
+    import detection
+    from detection import trackVehicles
+
+    detection.vID = lastID
+    data, points = [], []
+    while True:
+        meta = input.get()
+        if meta is None:
+            break
+
+        applySettings(control, None)
+
+        startTime = time.time()
+        classes, confidences, boxes = meta.pop('detections')
+        _, data, points = trackVehicles(ring.frames[meta['slot']], data, points, classes, confidences, boxes,
+                                        draw=clients.value > 0)
+        meta['times']['track'] = time.time() - startTime
+        meta['times']['reid'] = detection.getEncodeTime()
+        meta['vehicles'] = 0 if boxes is None else len(boxes)
+        if len(data) > 0:
+            results.put(('data', data, points))
+            data, points = [], []
+
+        output.put(meta)
+
+    output.put(None)
+
+
+"""
+Encoding stage. Encodes the annotated slot to JPEG if any client is watching,
+releases the slot and reports the stage latencies back to the capture scheduler.
+"""
+def encodeStage(ring, freeSlots, input, results, feedback, clients):
+    from stream import JpegEncoder
+
+    encoder = JpegEncoder()
+    while True:
+        meta = input.get()
+        if meta is None:
+            break
+
+        startTime = time.time()
+        jpeg = None
+        if clients.value > 0:
+            jpeg = encoder.encode(ring.frames[meta['slot']], clients.value)
+        meta['times']['encode'] = time.time() - startTime
+        freeSlots.put(meta['slot'])
+
+        feedback.put((max(meta['times'].values()), meta.get('vehicles', 0)))
+        results.put(('frame', jpeg, meta))
+
+    results.put(None)
+
+
+"""
+Multi-process pipeline capture -> detect -> track -> encode. Each stage runs
+in its own process so detection, ReID and JPEG encoding use separate cores
+and do not compete with the Dash callbacks for the GIL.
+"""
+class ProcessPipeline():
+    def __init__(self, allowedClasses, lastID=None, slots=6):
+        ctx = mp.get_context('spawn')
+        self.ring = SharedFrameRing(slots)
+        self.freeSlots = ctx.Queue()
+        for slot in range(slots):
+            self.freeSlots.put(slot)
+
+        detectQueue, trackQueue, encodeQueue = ctx.Queue(), ctx.Queue(), ctx.Queue()
+        feedback = ctx.Queue()
+        self.results = ctx.Queue()
+        self.controls = [ctx.Queue(), ctx.Queue()]
+        self.clients = ctx.Value('i', 0, lock=False)
+        self.settings = None
+
+        self.processes = [
+            ctx.Process(target=captureStage, args=(self.ring, self.freeSlots, detectQueue, feedback), daemon=True),
+            ctx.Process(target=detectStage, args=(self.ring, self.controls[0], detectQueue, trackQueue,
+                                                  allowedClasses), daemon=True),
+            ctx.Process(target=trackStage, args=(self.ring, self.controls[1], trackQueue, encodeQueue,
+                                                 self.results, lastID, self.clients), daemon=True),
+            ctx.Process(target=encodeStage, args=(self.ring, self.freeSlots, encodeQueue, self.results,
+                                                  feedback, self.clients), daemon=True),
+        ]
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+            process.join()
+        self.ring.unlink()
+
+    def is_alive(self):
+        return any(process.is_alive() for process in self.processes)
+
+    # Sends changed settings to the detection and tracking stages
+    def updateSettings(self, settings):
+        if settings == self.settings:
+            return
+        self.settings = settings
+        for control in self.controls:
+            control.put(dict(settings))
+
+    # Number of stream clients, the encode stage is idle without them
+    def setClients(self, clients):
+        self.clients.value = clients
+
+    # Returns the next ('frame', jpeg or None, meta) or ('data', data, points) message, None at the end
+    def getResult(self):
+        return self.results.get()
@@ -0,0 +1,115 @@
+import cv2
+import json
+import threading
+import numpy as np
+
+from utils import WIDTH, HEIGHT
+
+
+stores = {}
+storesLock = threading.Lock()
+
+"""
+Polygons and counting lines of one polygons file compiled for the processing
+loop. The mask is compiled into a uint8 image (0 inside the mask polygons,
+255 elsewhere) and the areas into an int16 label image holding the index of
+the area at every pixel (-1 outside the areas, the first listed area wins
+where they overlap), nextLabels holds the second listed area at the overlaps. Lines are directed segments (L, 2, 2) from the first to
+the second point. When any lines are defined, vehicles are counted by line
+crossings and the areas do not limit the detection.
+"""
+class CompiledPolygons():
+    def __init__(self, polygons):
+        self.mask = polygons['mask']
+        self.areas = polygons['areas']
+        self.lines = polygons.get('lines', {})
+
+        self.maskImage = np.full((HEIGHT, WIDTH), 255, np.uint8)
+        for poly in self.mask.values():
+            cv2.fillPoly(self.maskImage, [np.array(poly, np.int32)], 0)
+
+        areas = list(self.areas.values())
+        self.labels = np.full((HEIGHT, WIDTH), -1, np.int16)
+        self.nextLabels = np.full((HEIGHT, WIDTH), -1, np.int16)
+        for zone in reversed(range(len(areas))):
+            inside = np.zeros((HEIGHT, WIDTH), np.uint8)
+            cv2.fillPoly(inside, [np.array(areas[zone], np.int32)], 1)
+            inside = inside.view(bool)
+            self.nextLabels[inside] = self.labels[inside]
+            self.labels[inside] = zone
+
+        self.segments = np.array(list(self.lines.values()), np.float32).reshape(-1, 2, 2)
+
+        # Counting zones and the areas the detector and motion gate are limited to
+        self.names = list(self.lines) if len(self.lines) > 0 else list(self.areas)
+        self.regions = self.areas if len(self.lines) == 0 else {}
+
+        self.overlay = None
+
+    # Draws the areas and lines into the frame, their pixels are rendered once on first use
+    def drawOverlay(self, frame):
+        if self.overlay is None or self.overlay[0] != frame.shape:
+            image = np.zeros(frame.shape, np.uint8)
+            for poly in self.areas.values():
+                cv2.polylines(image, [np.array(poly, np.int32)], True, (255, 0, 255), 2)
+            for start, end in self.segments.astype(np.int32).tolist():
+                cv2.arrowedLine(image, tuple(start), tuple(end), (0, 255, 255), 2, tipLength=0.05)
+
+            self.overlay = (frame.shape, image, image.any(axis=2).astype(np.uint8))
+
+        _, image, mask = self.overlay
+        cv2.copyTo(image, mask, frame)
+
+
+"""
+Shared store of one polygons file. The polygons are compiled once per change
+and swapped with a single assignment, so the processing loop always reads a
+consistent state without locking or re-reading the file.
+"""
+class PolygonStore():
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.version = 0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                polygons = json.load(f)
+        except:
+            print('Error while reading polygons file!')
+            exit()
+
+        self.compile(polygons)
+
+    def compile(self, polygons):
+        self.state = CompiledPolygons(polygons)
+        self.version += 1
+
+    # Returns the current CompiledPolygons
+    def get(self):
+        return self.state
+
+    # Saves the changed keys ('areas', 'mask', 'lines') to the file and swaps the compiled state
+    def update(self, **changes):
+        with self.lock:
+            with open(self.path, "r+") as f:
+                polygons = json.load(f)
+                polygons.update(changes)
+                f.seek(0)  # rewind
+                json.dump(polygons, f)
+                f.truncate()
+
+            self.compile(polygons)
+
+
+"""
+Returns the shared store of the given polygons file.
+"""
+def getStore(path='polygons.json'):
+    with storesLock:
+        if path not in stores:
+            stores[path] = PolygonStore(path)
+
+        return stores[path]
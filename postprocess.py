@@ -0,0 +1,50 @@
+import cv2
+import numpy as np
+
+
+NMS_THRESHOLD = 0.4
+
+allowedIDs = None
+
+"""
+Returns a boolean lookup of the class IDs in allowedClasses.
+"""
+def getAllowedIDs(classNames, allowedClasses):
+    global allowedIDs
+
+    key = (tuple(classNames), tuple(allowedClasses))
+    if allowedIDs is None or allowedIDs[0] != key:
+        allowedIDs = (key, np.isin(classNames, allowedClasses))
+
+    return allowedIDs[1]
+
+
+"""
+Turns the raw YOLO output rows (x, y, w, h, objectness, class scores) of one
+frame into (classes, confidences, boxes) arrays for the tracker. Rows of other
+than the allowed classes and low scores are dropped before a single NMS call,
+which keeps the boxes of different classes apart by offsetting them.
+"""
+def parseDetections(out, shape, size, roi, allowed, confThreshold, classNames):
+    x, y, w, h = roi if roi is not None else (0, 0) + tuple(size)
+
+    # Class scores are already multiplied by the objectness, so it bounds them
+    out = out[out[:, 4] > confThreshold]
+    classIDs = np.argmax(out[:, 5:], axis=1)
+    scores = out[np.arange(len(out)), 5 + classIDs]
+    keep = (scores > confThreshold) & allowed[classIDs]
+    out, classIDs, scores = out[keep], classIDs[keep], scores[keep]
+
+    # Center based coordinates relative to the roi to (x, y, w, h) in frame pixels
+    scale = (shape[1] / size[0], shape[0] / size[1])
+    wh = out[:, 2:4] * (w, h)
+    xy = out[:, 0:2] * (w, h) - wh / 2 + (x, y)
+    boxes = np.hstack((xy * scale, wh * scale)).astype(np.int32)
+
+    # Non-maximum suppression per class, same as cv2.dnn_DetectionModel
+    offsets = np.zeros_like(boxes)
+    offsets[:, :2] = classIDs[:, np.newaxis] * 2 * max(shape[0], shape[1])
+    indices = cv2.dnn.NMSBoxes((boxes + offsets).tolist(), scores.tolist(), confThreshold, NMS_THRESHOLD)
+    indices = np.sort(np.asarray(indices, dtype=np.int64).reshape(-1))
+
+    return np.array(classNames)[classIDs[indices]], scores[indices], boxes[indices]
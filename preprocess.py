@@ -0,0 +1,48 @@
+import cv2
+import numpy as np
+
+from utils import WIDTH, HEIGHT
+
+
+"""
+Builds the network input blob in a preallocated buffer. Masking, scaling to
+[0, 1] and the HWC -> CHW conversion are done in a single pass, so the frame
+is neither copied nor resized again when it already has the network geometry.
+The same WIDTH x HEIGHT frame is then used for the overlay and the ReID crops.
+"""
+class Preprocessor():
+    def __init__(self, size=(WIDTH, HEIGHT)):
+        self.size = size
+        self.blob = np.empty((0, 3, size[1], size[0]), np.float32)
+        self.resized = np.empty((size[1], size[0], 3), np.uint8)
+        self.scales = {}
+
+    # Returns per pixel scale factors of the compiled mask image, 1/255 outside and 0 inside the mask
+    def getScale(self, maskImage):
+        key = id(maskImage)
+        if key not in self.scales or self.scales[key][0] is not maskImage:
+            scale = maskImage
+            if scale.shape[1::-1] != self.size:
+                scale = cv2.resize(scale, self.size, interpolation=cv2.INTER_NEAREST)
+            scale = np.where(scale > 0, np.float32(1 / 255), np.float32(0))
+            self.scales[key] = (maskImage, scale[np.newaxis])
+
+        return self.scales[key][1]
+
+    # Returns the (N, 3, h, w) blob of the masked frames cropped to roi (x, y, w, h), whole frames by default
+    def prepare(self, frames, maskImages, roi=None):
+        x, y, w, h = roi if roi is not None else (0, 0) + self.size
+        if self.blob.shape[0] < len(frames) or self.blob.shape[2:] != (h, w):
+            self.blob = np.empty((max(len(frames), self.blob.shape[0]), 3, h, w), np.float32)
+
+        # Drop scales of masks that were replaced in the editor
+        if len(self.scales) > len(maskImages) + 8:
+            self.scales = {}
+
+        for i, (frame, maskImage) in enumerate(zip(frames, maskImages)):
+            if frame.shape[1::-1] != self.size:
+                frame = cv2.resize(frame, self.size, dst=self.resized, interpolation=cv2.INTER_LINEAR)
+            np.multiply(frame[y:y + h, x:x + w].transpose(2, 0, 1), self.getScale(maskImage)[:, y:y + h, x:x + w],
+                        out=self.blob[i])
+
+        return self.blob[:len(frames)]
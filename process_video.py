@@ -0,0 +1,151 @@
+import os
+import cv2
+import argparse
+import dotenv
+import pandas as pd
+import multiprocessing as mp
+from datetime import datetime, timedelta
+
+from utils import WIDTH, HEIGHT, interpolation
+
+
+"""
+Limits the threads of a worker process, so the workers together use about
+one thread per core. Must run before the models are loaded.
+"""
+def initWorker(threads):
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    cv2.setNumThreads(threads)
+
+
+"""
+Processes one time chunk of a recorded video. The tracker is warmed up on
+`overlap` seconds before the chunk start, vehicles counted during the warm-up
+belong to the previous chunk and are dropped.
+"""
+def processChunk(video, start, end, overlap, stride, allowedClasses, videoStart):
+    import detection
+    from detection import detectVehicles, trackVehicles, hasMotion
+
+    # IDs are renumbered when the chunks are merged
+    detection.vID = 0
+
+    capture = cv2.VideoCapture(video)
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    first, last = int(max(0, start - overlap) * fps), int(end * fps)
+    capture.set(cv2.CAP_PROP_POS_FRAMES, first)
+
+    data, points, kept = [], [], set()
+    for index in range(first, last):
+        # Same frames are processed no matter where the chunk starts
+        if index % stride != 0:
+            if not capture.grab():
+                break
+            continue
+
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frame = cv2.resize(frame, (WIDTH, HEIGHT), interpolation=interpolation(frame))
+
+        position = index / fps
+        if hasMotion(frame):
+            classes, confidences, boxes = detectVehicles(frame, allowedClasses)
+        else:
+            classes, confidences, boxes = None, None, None
+
+        count = len(data)
+        _, data, points = trackVehicles(frame, data, points, classes, confidences, boxes,
+                                        videoStart + timedelta(seconds=position), draw=False)
+        if position >= start:
+            kept.update(d['VehicleID'] for d in data[count:])
+
+    capture.release()
+    print('Processed {0:.0f}-{1:.0f} s, {2} vehicles.'.format(start, end, len(kept)))
+
+    return [d for d in data if d['VehicleID'] in kept], [p for p in points if p['VehicleID'] in kept]
+
+
+"""
+Merges vehicles from all chunks in time order and renumbers their IDs.
+"""
+def mergeChunks(results, firstID=1):
+    data, points = [], []
+    for chunkData, chunkPoints in results:
+        ids = {}
+        for d in sorted(chunkData, key=lambda d: (d['Timestamp'], d['VehicleID'])):
+            ids[d['VehicleID']] = firstID + len(data)
+            data.append(dict(d, VehicleID=ids[d['VehicleID']]))
+        points += [dict(p, VehicleID=ids[p['VehicleID']]) for p in chunkPoints]
+
+    return data, points
+
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description="Offline processing of recorded traffic video.")
+    parser.add_argument("video", help="Path to the video file.")
+    parser.add_argument("--start", default=None,
+                        help="Date and time of the first frame (YYYY-MM-DD HH:MM:SS). "
+                             "Defaults to the file modification time.")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count()),
+                        help="Number of worker processes, each loads its own copy of the models. "
+                             "The cores are split evenly between them.")
+    parser.add_argument("--chunk", type=float, default=300, help="Chunk length in seconds.")
+    parser.add_argument("--overlap", type=float, default=20,
+                        help="Seconds before every chunk used to warm up the tracker.")
+    parser.add_argument("--stride", type=int, default=3, help="Process every n-th frame.")
+    parser.add_argument("--classes", default='car,bus,truck', help="Comma separated allowed classes.")
+    parser.add_argument("--output", default='./application/data', help="Output directory for CSV files.")
+    parser.add_argument("--db", action='store_true', help="Save the results to the database.")
+
+    return parser.parse_args()
+
+
+def main():
+    args = parseArgs()
+    dotenv.load_dotenv(dotenv.find_dotenv())
+
+    if args.start is not None:
+        videoStart = datetime.strptime(args.start, "%Y-%m-%d %H:%M:%S")
+    else:
+        videoStart = datetime.fromtimestamp(os.path.getmtime(args.video))
+
+    capture = cv2.VideoCapture(args.video)
+    duration = capture.get(cv2.CAP_PROP_FRAME_COUNT) / capture.get(cv2.CAP_PROP_FPS)
+    capture.release()
+
+    allowedClasses = args.classes.split(',')
+    chunks = []
+    start = 0
+    while start < duration:
+        chunks.append((args.video, start, min(start + args.chunk, duration), args.overlap, args.stride,
+                       allowedClasses, videoStart))
+        start += args.chunk
+
+    # Models are loaded in the workers, spawn avoids sharing them across fork
+    workers = max(1, min(args.workers, len(chunks)))
+    threads = max(1, os.cpu_count() // workers)
+    with mp.get_context('spawn').Pool(workers, initializer=initWorker, initargs=(threads,)) as pool:
+        results = pool.starmap(processChunk, chunks)
+
+    firstID = 1
+    if args.db:
+        from database import getLastID
+        firstID = (getLastID() or 0) + 1
+    data, points = mergeChunks(results, firstID)
+    print('Counted {0} vehicles.'.format(len(data)))
+
+    if args.db:
+        from database import insert
+        insert(data, pd.DataFrame(points, columns=['X_point', 'Y_point', 'VehicleID']))
+    else:
+        name = os.path.splitext(os.path.basename(args.video))[0]
+        pd.DataFrame(data).to_csv(os.path.join(args.output, 'vehicles-{0}.csv'.format(name)), sep=';')
+        pd.DataFrame(points, columns=['X_point', 'Y_point', 'VehicleID']).to_csv(
+            os.path.join(args.output, 'points-{0}.csv'.format(name)), sep=';')
+
+
+if __name__ == "__main__":
+    main()
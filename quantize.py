@@ -0,0 +1,191 @@
+import os
+import cv2
+import json
+import time
+import argparse
+import dotenv
+import numpy as np
+
+from utils import WIDTH, HEIGHT, getClassNames, interpolation
+
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+"""
+Loads every stride-th frame of recordings (.rec), videos or images resized to
+WIDTH x HEIGHT the same way as the live stream, at most limit frames.
+"""
+def loadFrames(paths, limit, stride):
+    from recording import ReplayStream
+
+    frames = []
+    for path in paths:
+        if path.lower().endswith(IMAGE_EXTENSIONS):
+            frames.append(cv2.imread(path))
+            continue
+
+        if path.endswith('.rec'):
+            stream = ReplayStream(path, realtime=False)
+            read, close = stream.getFrame, stream.stop
+        else:
+            capture = cv2.VideoCapture(path)
+            read, close = lambda: capture.read()[1], capture.release
+
+        index = 0
+        while len(frames) < limit:
+            frame = read()
+            if frame is None:
+                break
+            if index % stride == 0:
+                frames.append(frame)
+            index += 1
+
+        close()
+
+    return [cv2.resize(frame, (WIDTH, HEIGHT), interpolation=interpolation(frame)) for frame in frames[:limit]]
+
+
+"""
+Quantizes the ONNX model to INT8 weights and activations, calibrated on the
+given frames, or converts its weights to FP16.
+"""
+def quantize(detector, model, output, frames, maskImage, mode):
+    import onnx
+    from preprocess import Preprocessor
+
+    if mode == 'fp16':
+        from onnxconverter_common import float16
+
+        onnx.save(float16.convert_float_to_float16(onnx.load(model), keep_io_types=True), output)
+        return
+
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    # Calibration inputs go through the same preprocessing as in the app
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            self.preprocessor = Preprocessor(detector.size)
+            self.frames = iter(frames)
+
+        def get_next(self):
+            frame = next(self.frames, None)
+            if frame is None:
+                return None
+
+            return detector.getInputs(self.preprocessor.prepare([frame], [maskImage]))
+
+    quantize_static(model, output, FrameReader(), quant_format=QuantFormat.QDQ, per_channel=True,
+                    weight_type=QuantType.QInt8, activation_type=QuantType.QUInt8)
+
+
+"""
+Runs the detector on the frames. Returns the per-frame latencies and the
+numbers of detected vehicles per class in every frame.
+"""
+def evaluate(detector, frames, maskImage, allowedClasses, confThreshold):
+    from preprocess import Preprocessor
+    from postprocess import getAllowedIDs, parseDetections
+
+    classNames = getClassNames()
+    allowed = getAllowedIDs(classNames, allowedClasses)
+    preprocessor = Preprocessor(detector.size)
+
+    # Warm up
+    detector.forward(preprocessor.prepare(frames[:1], [maskImage]))
+
+    times, counts = [], []
+    for frame in frames:
+        startTime = time.time()
+        out = detector.forward(preprocessor.prepare([frame], [maskImage]))[0]
+        classes, _, _ = parseDetections(out, frame.shape, detector.size, None, allowed, confThreshold, classNames)
+        times.append(time.time() - startTime)
+        counts.append({name: int(np.sum(classes == name)) for name in allowedClasses})
+
+    return np.array(times) * 1000, counts
+
+
+"""
+Compares the quantized model with the FP32 one. Count accuracy of a class is
+1 - |quantized - fp32| / fp32 of its total count, the frame error is the mean
+absolute difference of its count per frame.
+"""
+def report(reference, quantized, allowedClasses):
+    result = {}
+    for name, (times, counts) in (('fp32', reference), ('quantized', quantized)):
+        result[name] = {'mean_ms': float(times.mean()), 'p95_ms': float(np.percentile(times, 95))}
+    result['speedup'] = result['fp32']['mean_ms'] / result['quantized']['mean_ms']
+
+    result['classes'] = {}
+    for name in allowedClasses:
+        ref = np.array([c[name] for c in reference[1]])
+        quant = np.array([c[name] for c in quantized[1]])
+        result['classes'][name] = {
+            'fp32': int(ref.sum()),
+            'quantized': int(quant.sum()),
+            'accuracy': 1 - abs(int(quant.sum()) - int(ref.sum())) / max(1, int(ref.sum())),
+            'frame_error': float(np.abs(quant - ref).mean())
+        }
+
+    return result
+
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description="Quantize the ONNX vehicle detector and compare it with FP32.")
+    parser.add_argument("frames", nargs='+',
+                        help="Calibration recordings (.rec), videos or images, i.e. application/resources/canvas_bg.png.")
+    parser.add_argument("--model", default=os.getenv('DETECTOR_MODEL', 'yolov4'),
+                        help="FP32 ONNX model name in application/resources.")
+    parser.add_argument("--mode", choices=['int8', 'fp16'], default='int8', help="Quantization mode.")
+    parser.add_argument("--limit", type=int, default=200, help="Maximum number of calibration frames.")
+    parser.add_argument("--stride", type=int, default=15, help="Use every n-th frame of recordings and videos.")
+    parser.add_argument("--eval", nargs='*', default=None,
+                        help="Evaluation recordings, videos or images. Defaults to the calibration frames.")
+    parser.add_argument("--classes", default='car,bus,truck', help="Comma separated allowed classes.")
+    parser.add_argument("--polygons", default='polygons.json', help="Polygons file with the mask.")
+    parser.add_argument("--report", default=None, help="Save the report to a JSON file.")
+
+    return parser.parse_args()
+
+
+def main():
+    # Loaded first, so the .env values are used as the argument defaults
+    dotenv.load_dotenv(dotenv.find_dotenv())
+    args = parseArgs()
+
+    from detectors import MODELS_PATH, OnnxDetector, getDetectorSize
+    from polygons import getStore
+
+    size = getDetectorSize()
+    name = '{0}-{1}'.format(args.model, args.mode)
+    maskImage = getStore(args.polygons).get().maskImage
+    allowedClasses = args.classes.split(',')
+    confThreshold = float(os.getenv('CONFIDENCE_THRESHOLD', 0.5))
+
+    frames = loadFrames(args.frames, args.limit, args.stride)
+    print('Loaded {0} calibration frames.'.format(len(frames)))
+
+    detector = OnnxDetector(args.model, size)
+    quantize(detector, os.path.join(MODELS_PATH, args.model + '.onnx'), os.path.join(MODELS_PATH, name + '.onnx'),
+             frames, maskImage, args.mode)
+    print('Saved {0}.onnx, use it with DETECTOR_BACKEND=onnx and DETECTOR_MODEL={0}.'.format(name))
+
+    if args.eval is not None and len(args.eval) > 0:
+        frames = loadFrames(args.eval, args.limit, args.stride)
+    result = report(evaluate(detector, frames, maskImage, allowedClasses, confThreshold),
+                    evaluate(OnnxDetector(name, size), frames, maskImage, allowedClasses, confThreshold),
+                    allowedClasses)
+
+    print('{0:>10}: mean {1:.1f} ms, p95 {2:.1f} ms'.format('fp32', result['fp32']['mean_ms'], result['fp32']['p95_ms']))
+    print('{0:>10}: mean {1:.1f} ms, p95 {2:.1f} ms, {3:.2f}x faster'.format(
+        args.mode, result['quantized']['mean_ms'], result['quantized']['p95_ms'], result['speedup']))
+    for className, values in result['classes'].items():
+        print('{0:>10}: {1} vs {2} in fp32, count accuracy {3:.1%}, mean frame error {4:.2f}'.format(
+            className, values['quantized'], values['fp32'], values['accuracy'], values['frame_error']))
+
+    if args.report is not None:
+        with open(args.report, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import cv2
+import time
+import queue
+import struct
+import threading
+import numpy as np
+
+from utils import WIDTH, HEIGHT, interpolation
+
+
+MAGIC = b'TRAFFICREC1\n'
+HEADER = struct.Struct('<dI')
+
+# Fastest lossless PNG settings, the filter option needs OpenCV 4.10+
+PNG_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 1, cv2.IMWRITE_PNG_STRATEGY, cv2.IMWRITE_PNG_STRATEGY_RLE]
+if hasattr(cv2, 'IMWRITE_PNG_FILTER'):
+    PNG_PARAMS += [cv2.IMWRITE_PNG_FILTER, cv2.IMWRITE_PNG_FILTER_SUB]
+
+"""
+Writes frames with their capture timestamps to a recording file. Frames are
+stored in the native stream resolution as lossless PNG in records of
+(timestamp, length, data) and written on a separate thread. When the writer
+falls behind by more than bufferSize frames, new frames are dropped and
+counted.
+"""
+class FrameRecorder():
+    def __init__(self, path, bufferSize=60):
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC)
+        self.queue = queue.Queue(maxsize=bufferSize)
+        self.dropped = 0
+
+        self.thread = threading.Thread(target=self.work, daemon=True)
+        self.thread.start()
+
+    def write(self, frame, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        try:
+            self.queue.put_nowait((timestamp, frame))
+        except queue.Full:
+            self.dropped += 1
+
+    def work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            timestamp, frame = item
+
+            _, png = cv2.imencode('.png', frame, PNG_PARAMS)
+            self.file.write(HEADER.pack(timestamp, len(png)))
+            self.file.write(png.tobytes())
+
+        self.file.close()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+
+"""
+Replays a recording in place of VideoStream. With realtime=True the frames are
+paced by their recorded timestamps and a slow consumer skips frames as with a
+live stream, otherwise every frame is returned as fast as possible. Frames are
+resized to WIDTH x HEIGHT as in VideoStream.
+"""
+class ReplayStream():
+    def __init__(self, path, realtime=True):
+        self.file = open(path, 'rb')
+        if self.file.read(len(MAGIC)) != MAGIC:
+            raise ValueError('{0} is not a frame recording'.format(path))
+
+        # Index of (timestamp, offset, length) of every frame
+        self.index = []
+        while True:
+            header = self.file.read(HEADER.size)
+            if len(header) < HEADER.size:
+                break
+            timestamp, length = HEADER.unpack(header)
+            self.index.append((timestamp, self.file.tell(), length))
+            self.file.seek(length, 1)
+        self.timestamps = np.array([timestamp for timestamp, _, _ in self.index])
+
+        self.realtime = realtime
+        self.startTime = None
+        self.lastCaptured = 0
+        self.skipped = 0
+
+    def stop(self):
+        self.file.close()
+
+    # Returns timestamp of the last returned frame
+    def getTimestamp(self):
+        return self.index[self.lastCaptured - 1][0]
+
+    # Returns the next frame, or None at the end of the recording
+    def getFrame(self):
+        if self.lastCaptured >= len(self.index):
+            return None
+
+        position = self.lastCaptured
+        if self.realtime:
+            if self.startTime is None:
+                self.startTime = time.time() - self.timestamps[0]
+
+            # Wait for the next frame, then jump to the newest one available
+            delay = self.startTime + self.timestamps[position] - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            position = max(position, np.searchsorted(self.timestamps, time.time() - self.startTime, 'right') - 1)
+
+        _, offset, length = self.index[position]
+        self.file.seek(offset)
+        img = cv2.imdecode(np.frombuffer(self.file.read(length), np.uint8), cv2.IMREAD_COLOR)
+        if img.shape[:2] != (HEIGHT, WIDTH):
+            img = cv2.resize(img, (WIDTH, HEIGHT), interpolation=interpolation(img))
+
+        self.skipped += position - self.lastCaptured
+        self.lastCaptured = position + 1
+
+        return img
@@ -0,0 +1,101 @@
+import time
+import argparse
+import dotenv
+import numpy as np
+from datetime import datetime
+
+from recording import ReplayStream
+
+
+"""
+Records the CAM_URL stream to a file for later replays.
+"""
+def record(args):
+    from stream import VideoStream
+
+    stream = VideoStream(record=args.file)
+    endTime = time.time() + args.seconds
+    while time.time() < endTime and stream.getFrame() is not None:
+        pass
+    stream.stop()
+    print('Recorded {0} frames to {1}, {2} dropped by a slow writer.'.format(
+        stream.captured - stream.recordDropped, args.file, stream.recordDropped))
+
+
+"""
+Runs detection and tracking over a recording and reports the stage latencies.
+Every stride-th frame is processed, so runs on the same file are comparable.
+"""
+def bench(args):
+    import detection
+    from detection import detectVehicles, trackVehicles, hasMotion
+
+    # Counted vehicles are not stored, so IDs do not continue from the database
+    detection.vID = 0
+    stream = ReplayStream(args.file, realtime=args.realtime)
+    allowedClasses = args.classes.split(',')
+    times = {'detect': [], 'track': []}
+    data, points = [], []
+    processed = 0
+
+    startTime = time.time()
+    while True:
+        frame = stream.getFrame()
+        if frame is None:
+            break
+        if not args.realtime and (stream.lastCaptured - 1) % args.stride != 0:
+            continue
+
+        t1 = time.time()
+        if hasMotion(frame):
+            classes, confidences, boxes = detectVehicles(frame, allowedClasses)
+        else:
+            classes, confidences, boxes = None, None, None
+        t2 = time.time()
+        _, data, points = trackVehicles(frame, data, points, classes, confidences, boxes,
+                                        datetime.fromtimestamp(stream.getTimestamp()))
+        t3 = time.time()
+
+        times['detect'].append(t2 - t1)
+        times['track'].append(t3 - t2)
+        processed += 1
+    totalTime = time.time() - startTime
+    stream.stop()
+
+    print('Processed {0} frames ({1} skipped) in {2:.1f} s, {3:.1f} FPS, {4} vehicles counted.'.format(
+        processed, stream.skipped, totalTime, processed / totalTime, len(data)))
+    for stage, values in times.items():
+        values = np.array(values) * 1000
+        print('{0:>8}: mean {1:.1f} ms, p95 {2:.1f} ms'.format(stage, values.mean(), np.percentile(values, 95)))
+
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description="Record and replay the input stream for benchmarks.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parserRecord = subparsers.add_parser('record', help="Record the CAM_URL stream.")
+    parserRecord.add_argument("file", help="Output recording file.")
+    parserRecord.add_argument("--seconds", type=float, default=60, help="Length of the recording.")
+
+    parserBench = subparsers.add_parser('bench', help="Benchmark the processing on a recording.")
+    parserBench.add_argument("file", help="Recording file.")
+    parserBench.add_argument("--realtime", action='store_true',
+                             help="Pace the frames by their timestamps instead of as fast as possible.")
+    parserBench.add_argument("--stride", type=int, default=3, help="Process every n-th frame.")
+    parserBench.add_argument("--classes", default='car,bus,truck', help="Comma separated allowed classes.")
+
+    return parser.parse_args()
+
+
+def main():
+    args = parseArgs()
+    dotenv.load_dotenv(dotenv.find_dotenv())
+
+    if args.command == 'record':
+        record(args)
+    else:
+        bench(args)
+
+
+if __name__ == "__main__":
+    main()
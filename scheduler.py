@@ -0,0 +1,149 @@
+import os
+import numpy as np
+
+
+"""
+Adaptive frame-skip scheduler. Picks the detection stride (process every n-th
+source frame) from the measured processing latency, the target processing FPS
+(TARGET_FPS) and the traffic density. Busy scenes ask for more frames, but never
+more than the host can sustain, quiet scenes release the CPU.
+"""
+class FrameScheduler():
+    def __init__(self, sourceFPS=30, targetFPS=None, minStride=1, maxStride=15,
+                 busyDetections=8, smoothing=0.2):
+        if targetFPS is None:
+            targetFPS = float(os.getenv('TARGET_FPS', 10))
+
+        self.sourceFPS = sourceFPS
+        self.targetFPS = targetFPS
+        self.minStride = minStride
+        self.maxStride = maxStride
+        self.busyDetections = busyDetections
+        self.smoothing = smoothing
+
+        self.stride = 3
+        self.latency = None
+        self.detections = 0.
+        self.lastIndex = None
+
+    # Returns True if the source frame with the given index should be processed
+    def shouldProcess(self, index):
+        if self.lastIndex is not None and index - self.lastIndex < self.stride:
+            return False
+
+        self.lastIndex = index
+        return True
+
+    # Updates the stride with the latency [s] and detection count of a processed frame
+    def update(self, latency, detections):
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.smoothing * (latency - self.latency)
+        self.detections += self.smoothing * (detections - self.detections)
+
+        # Traffic density scales the target between 0.5x and 1.5x
+        density = min(self.detections / self.busyDetections, 1.)
+        fps = self.targetFPS * (0.5 + density)
+
+        # Never ask for more frames than the host is able to process
+        if self.latency > 0:
+            fps = min(fps, 1. / self.latency)
+
+        self.stride = int(np.clip(np.ceil(self.sourceFPS / fps), self.minStride, self.maxStride))
+
+        return self.stride
+
+
+"""
+Returns candidate network input sizes from the given one down to 40 % of it,
+keeping the aspect ratio, divisible by 32 and largest first.
+"""
+def getInputSizes(size, scales=(1., 0.85, 0.7, 0.55, 0.4)):
+    sizes = []
+    for scale in scales:
+        candidate = tuple(max(32, int(round(value * scale / 32)) * 32) for value in size)
+        if candidate not in sizes:
+            sizes.append(candidate)
+
+    return sizes
+
+
+"""
+Picks the network input size against the per-frame detection latency target
+(LATENCY_TARGET [ms]). At startup the largest size meeting the target is
+found by a benchmark. At runtime the size steps down when the smoothed
+latency stays above the target and back up, at most to the starting size,
+once the larger size is estimated to fit the target with a margin for a long
+time. Without a target the size never changes.
+"""
+class InputSizeController():
+    def __init__(self, sizes, target=None, smoothing=0.1, patience=10, recovery=300, headroom=0.8):
+        if target is None and os.getenv('LATENCY_TARGET'):
+            target = float(os.getenv('LATENCY_TARGET'))
+
+        self.sizes = sizes
+        self.target = target / 1000 if target else None
+        self.smoothing = smoothing
+        self.patience = patience
+        self.recovery = recovery
+        self.headroom = headroom
+
+        self.index = 0
+        self.largest = 0
+        self.latency = None
+        self.slow = 0
+        self.fast = 0
+
+    def getSize(self):
+        return self.sizes[self.index]
+
+    # Benchmarks the sizes with benchmark(size) -> latency [s], returns the largest one meeting the target
+    def calibrate(self, benchmark):
+        if self.target is None:
+            return self.getSize()
+
+        for index, size in enumerate(self.sizes):
+            self.index = index
+            latency = benchmark(size)
+            print('Input size {0}x{1}: {2:.1f} ms'.format(size[0], size[1], latency * 1000))
+            if latency <= self.target:
+                break
+
+        self.largest = self.index
+        self.latency = None
+
+        return self.getSize()
+
+    # Updates the smoothed latency [s] of a processed frame, returns the new size if it changes
+    def update(self, latency):
+        if self.target is None:
+            return None
+
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.smoothing * (latency - self.latency)
+
+        # Overloaded host, step down
+        self.slow = self.slow + 1 if self.latency > self.target else 0
+        if self.slow >= self.patience and self.index < len(self.sizes) - 1:
+            return self.step(1)
+
+        # Latency grows roughly with the input area
+        if self.index > self.largest:
+            larger, size = self.sizes[self.index - 1], self.getSize()
+            ratio = larger[0] * larger[1] / (size[0] * size[1])
+            self.fast = self.fast + 1 if self.latency * ratio < self.headroom * self.target else 0
+            if self.fast >= self.recovery:
+                return self.step(-1)
+
+        return None
+
+    def step(self, direction):
+        self.index += direction
+        self.latency = None
+        self.slow = 0
+        self.fast = 0
+
+        return self.getSize()
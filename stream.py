@@ -0,0 +1,228 @@
+import os
+import cv2
+import time
+import threading
+from collections import deque
+from vidgear.gears import CamGear
+
+from utils import WIDTH, HEIGHT, interpolation
+from recording import FrameRecorder, ReplayStream
+
+
+options = {
+    "STREAM_RESOLUTION": '480p',
+    "STREAM_PARAMS": {"nocheckcertificate": True},
+    "CAP_PROP_FPS": 30
+}
+
+"""
+Class working with video stream. Frames are read by a dedicated capture
+thread into a small drop-oldest buffer, so a slow processing loop never
+stalls the decoder. getFrame always returns the freshest frame and counts
+the ones that were skipped.
+"""
+class VideoStream():
+    def __init__(self, source=None, bufferSize=3, record=None):
+        if source is None:
+            source = os.getenv('CAM_URL')
+        self.stream = CamGear(source=source,
+                              stream_mode=True, logging=True, **options).start()
+        self.recorder = FrameRecorder(record) if record is not None else None
+        self.recordDropped = 0
+        self.buffer = deque(maxlen=bufferSize)
+        self.condition = threading.Condition()
+        self.captured = 0
+        self.lastCaptured = 0
+        self.skipped = 0
+        self.running = True
+
+        self.thread = threading.Thread(target=self.capture, daemon=True)
+        self.thread.start()
+
+    def __del__(self):
+        self.stop()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.stream.stop()
+
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recordDropped = self.recorder.dropped
+            self.recorder = None
+
+    def capture(self):
+        while self.running:
+            img = self.stream.read()
+            if img is None:
+                break
+            # Recorded in the native resolution, replays resize it the same way
+            if self.recorder is not None:
+                self.recorder.write(img)
+
+            img = cv2.resize(img, (WIDTH, HEIGHT), interpolation=interpolation(img))
+
+            with self.condition:
+                self.buffer.append((self.captured, img))
+                self.captured += 1
+                self.condition.notify_all()
+
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    # Returns the newest frame, or None when the stream has ended
+    def getFrame(self):
+        with self.condition:
+            self.condition.wait_for(lambda: len(self.buffer) > 0 or not self.running)
+            if len(self.buffer) == 0:
+                return None
+
+            index, img = self.buffer.pop()
+            self.buffer.clear()
+
+        self.skipped += index - self.lastCaptured
+        self.lastCaptured = index + 1
+
+        return img
+
+
+"""
+Returns the frame source. Replay of REPLAY_FILE if set (paced by the recorded
+timestamps unless REPLAY_REALTIME=False), otherwise the live stream, which is
+recorded to RECORD_FILE if set.
+"""
+def openStream():
+    if os.getenv('REPLAY_FILE'):
+        return ReplayStream(os.getenv('REPLAY_FILE'), realtime=os.getenv('REPLAY_REALTIME', 'True') == 'True')
+
+    return VideoStream(record=os.getenv('RECORD_FILE') or None)
+
+
+"""
+Shared slot with the latest encoded frame of the processing pipeline.
+The pipeline publishes every annotated frame once and each /video_stream
+client gets its own lightweight reader, which always jumps to the newest
+frame and drops the stale ones.
+"""
+class FrameBroadcaster():
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.jpeg = None
+        self.frameID = 0
+        self.clients = 0
+
+    def publish(self, jpeg):
+        with self.condition:
+            self.jpeg = jpeg
+            self.frameID += 1
+            self.condition.notify_all()
+
+    def getClients(self):
+        with self.condition:
+            return self.clients
+
+    def subscribe(self):
+        with self.condition:
+            self.clients += 1
+
+        lastID = 0
+        try:
+            while True:
+                with self.condition:
+                    # Timeout so that a stalled pipeline does not block the client forever
+                    if not self.condition.wait_for(lambda: self.frameID != lastID, timeout=1.0):
+                        continue
+                    jpeg, lastID = self.jpeg, self.frameID
+
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n\r\n')
+        finally:
+            with self.condition:
+                self.clients -= 1
+
+
+"""
+JPEG encoder adapting quality and output resolution to the number of clients
+and the bandwidth budget STREAM_BANDWIDTH [kbit/s] shared by all of them.
+"""
+class JpegEncoder():
+    def __init__(self, bandwidth=None, minQuality=30, maxQuality=90):
+        if bandwidth is None:
+            bandwidth = float(os.getenv('STREAM_BANDWIDTH', 8000))
+
+        self.budget = bandwidth * 1000 / 8
+        self.minQuality = minQuality
+        self.maxQuality = maxQuality
+        self.quality = 80
+        self.scale = 1.
+        self.interval = None
+        self.lastTime = None
+
+    def encode(self, frame, clients):
+        currTime = time.time()
+        if self.lastTime is not None:
+            interval = currTime - self.lastTime
+            self.interval = interval if self.interval is None else self.interval + 0.2 * (interval - self.interval)
+        self.lastTime = currTime
+
+        if self.scale < 1:
+            frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        _, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+
+        # Every client gets every frame, so the budget per frame shrinks with clients and FPS
+        if self.interval is not None:
+            self.adapt(len(jpeg), self.budget * self.interval / max(clients, 1))
+
+        return jpeg.tobytes()
+
+    # Lowers the quality first, the resolution only when the quality is at its minimum
+    def adapt(self, size, budget):
+        if size > budget:
+            if self.quality > self.minQuality:
+                self.quality = max(self.minQuality, self.quality - 5)
+            elif self.scale > 0.5:
+                self.scale = max(0.5, self.scale - 0.25)
+        elif size < 0.6 * budget:
+            if self.scale < 1:
+                self.scale = min(1., self.scale + 0.25)
+            elif self.quality < self.maxQuality:
+                self.quality = min(self.maxQuality, self.quality + 5)
+
+
+"""
+Encodes frames on its own thread, off the processing loop. Frames are only
+encoded while at least one /video_stream client is connected, a frame that
+was not encoded in time is replaced by the newer one.
+"""
+class EncodeWorker():
+    def __init__(self, broadcaster):
+        self.broadcaster = broadcaster
+        self.encoder = JpegEncoder()
+        self.condition = threading.Condition()
+        self.frame = None
+        self.encodeTime = 0
+
+        self.thread = threading.Thread(target=self.work, daemon=True)
+        self.thread.start()
+
+    def submit(self, frame):
+        if self.broadcaster.getClients() == 0:
+            return
+
+        with self.condition:
+            self.frame = frame
+            self.condition.notify()
+
+    def work(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.frame is not None)
+                frame, self.frame = self.frame, None
+
+            startTime = time.time()
+            jpeg = self.encoder.encode(frame, self.broadcaster.getClients())
+            self.encodeTime = time.time() - startTime
+            self.broadcaster.publish(jpeg)
@@ -0,0 +1,233 @@
+"""
+Checks that the vectorized Deep SORT paths (batched Kalman filter, NxM IoU,
+batched gating, mask based assignment bookkeeping, single-pass matching
+cascade and the float32 appearance gallery) give the same results as the
+original per-track and per-row implementations, kept here as the reference.
+
+Run from the repository root:
+    python -m unittest tests.test_tracker_equivalence
+"""
+import unittest
+from unittest import mock
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from application.deep_sort import iou_matching, kalman_filter, linear_assignment, nn_matching
+from application.deep_sort.detection import Detection
+from application.deep_sort.tracker import Tracker
+
+
+# Reference implementations, as they were before the vectorization
+
+def referenceIouCost(tracks, detections, track_indices=None, detection_indices=None):
+    if track_indices is None:
+        track_indices = np.arange(len(tracks))
+    if detection_indices is None:
+        detection_indices = np.arange(len(detections))
+
+    cost_matrix = np.zeros((len(track_indices), len(detection_indices)))
+    for row, track_idx in enumerate(track_indices):
+        if tracks[track_idx].time_since_update > 1:
+            cost_matrix[row, :] = linear_assignment.INFTY_COST
+            continue
+
+        bbox = tracks[track_idx].to_tlwh()
+        candidates = np.asarray([detections[i].tlwh for i in detection_indices])
+        cost_matrix[row, :] = 1. - iou_matching.iou(bbox, candidates)
+    return cost_matrix
+
+
+def referenceMinCostMatching(distance_metric, max_distance, tracks, detections, track_indices=None,
+                             detection_indices=None):
+    if track_indices is None:
+        track_indices = np.arange(len(tracks))
+    if detection_indices is None:
+        detection_indices = np.arange(len(detections))
+
+    if len(detection_indices) == 0 or len(track_indices) == 0:
+        return [], track_indices, detection_indices
+
+    cost_matrix = distance_metric(tracks, detections, track_indices, detection_indices)
+    return referenceAssignment(cost_matrix, max_distance, track_indices, detection_indices)
+
+
+def referenceAssignment(cost_matrix, max_distance, track_indices, detection_indices):
+    cost_matrix[cost_matrix > max_distance] = max_distance + 1e-5
+    indices = linear_sum_assignment(cost_matrix)
+    indices = np.hstack([indices[0].reshape(-1, 1), indices[1].reshape(-1, 1)])
+
+    matches, unmatched_tracks, unmatched_detections = [], [], []
+    for col, detection_idx in enumerate(detection_indices):
+        if col not in indices[:, 1]:
+            unmatched_detections.append(detection_idx)
+    for row, track_idx in enumerate(track_indices):
+        if row not in indices[:, 0]:
+            unmatched_tracks.append(track_idx)
+    for row, col in indices:
+        track_idx = track_indices[row]
+        detection_idx = detection_indices[col]
+        if cost_matrix[row, col] > max_distance:
+            unmatched_tracks.append(track_idx)
+            unmatched_detections.append(detection_idx)
+        else:
+            matches.append((track_idx, detection_idx))
+    return matches, unmatched_tracks, unmatched_detections
+
+
+def referenceMatchingCascade(distance_metric, max_distance, cascade_depth, tracks, detections,
+                             track_indices=None, detection_indices=None):
+    if track_indices is None:
+        track_indices = list(range(len(tracks)))
+    if detection_indices is None:
+        detection_indices = list(range(len(detections)))
+
+    unmatched_detections = detection_indices
+    matches = []
+    for level in range(cascade_depth):
+        if len(unmatched_detections) == 0:
+            break
+
+        track_indices_l = [k for k in track_indices if tracks[k].time_since_update == 1 + level]
+        if len(track_indices_l) == 0:
+            continue
+
+        matches_l, _, unmatched_detections = referenceMinCostMatching(
+            distance_metric, max_distance, tracks, detections, track_indices_l, unmatched_detections)
+        matches += matches_l
+    unmatched_tracks = list(set(track_indices) - set(k for k, _ in matches))
+    return matches, unmatched_tracks, unmatched_detections
+
+
+def referenceGateCostMatrix(kf, cost_matrix, tracks, detections, track_indices, detection_indices,
+                            gated_cost=linear_assignment.INFTY_COST, only_position=False):
+    gating_threshold = kalman_filter.chi2inv95[2 if only_position else 4]
+    measurements = np.asarray([detections[i].to_xyah() for i in detection_indices])
+    for row, track_idx in enumerate(track_indices):
+        track = tracks[track_idx]
+        gating_distance = kf.gating_distance(track.mean, track.covariance, measurements, only_position)
+        cost_matrix[row, gating_distance > gating_threshold] = gated_cost
+    return cost_matrix
+
+
+"""
+Simulated scene of vehicles moving at constant speed with noisy boxes and
+features. Detections are randomly missed and some vehicles are occluded for
+longer periods, so the matching cascade sees several track ages.
+"""
+def simulateScene(frames=150, vehicles=30, seed=0):
+    rng = np.random.RandomState(seed)
+    positions = rng.uniform(0, 1000, (vehicles, 2))
+    velocities = rng.uniform(-5, 5, (vehicles, 2))
+    sizes = rng.uniform(30, 80, (vehicles, 2))
+    features = rng.randn(vehicles, 128)
+    occluded = np.zeros(vehicles, np.int64)
+
+    scene = []
+    for _ in range(frames):
+        positions += velocities
+        occluded = np.maximum(occluded - 1, 0)
+        occluded[rng.rand(vehicles) < 0.01] = rng.randint(3, 15)
+
+        detections = []
+        for i in range(vehicles):
+            if occluded[i] > 0 or rng.rand() < 0.1:
+                continue
+            tlwh = np.r_[positions[i] + rng.randn(2), sizes[i]]
+            feature = features[i] + 0.1 * rng.randn(128)
+            detections.append((tlwh, 0.9, 'car', (feature / np.linalg.norm(feature)).astype(np.float32)))
+        scene.append(detections)
+
+    return scene
+
+
+def runTracker(tracker, scene):
+    states = []
+    for frame in scene:
+        tracker.predict()
+        tracker.update([Detection(*detection) for detection in frame])
+        states.append([(track.track_id, track.state, track.to_tlbr()) for track in tracker.tracks])
+
+    return states
+
+
+class VectorizedPathsTest(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.RandomState(1)
+        self.kf = kalman_filter.KalmanFilter()
+
+    def randomStates(self, count):
+        means, covariances = [], []
+        for _ in range(count):
+            mean, covariance = self.kf.initiate(np.r_[self.rng.uniform(0, 1000, 2), self.rng.uniform(0.3, 2),
+                                                      self.rng.uniform(30, 100)])
+            for _ in range(self.rng.randint(1, 5)):
+                mean, covariance = self.kf.predict(mean, covariance)
+            means.append(mean)
+            covariances.append(covariance)
+
+        return np.array(means), np.array(covariances)
+
+    def test_iou_matrix(self):
+        bboxes = self.rng.uniform(0, 100, (7, 4))
+        candidates = self.rng.uniform(0, 100, (9, 4))
+        expected = np.array([iou_matching.iou(bbox, candidates) for bbox in bboxes])
+
+        np.testing.assert_allclose(iou_matching.iou_matrix(bboxes, candidates), expected)
+
+    def test_kalman_batch(self):
+        means, covariances = self.randomStates(6)
+        measurements = self.rng.uniform(10, 500, (6, 4))
+
+        predicted = [self.kf.predict(m, c) for m, c in zip(means, covariances)]
+        batchMeans, batchCovariances = self.kf.predict_batch(means.copy(), covariances.copy())
+        np.testing.assert_allclose(batchMeans, [m for m, _ in predicted])
+        np.testing.assert_allclose(batchCovariances, [c for _, c in predicted])
+
+        updated = [self.kf.update(m, c, z) for m, c, z in zip(means, covariances, measurements)]
+        batchMeans, batchCovariances = self.kf.update_batch(means, covariances, measurements)
+        np.testing.assert_allclose(batchMeans, [m for m, _ in updated])
+        np.testing.assert_allclose(batchCovariances, [c for _, c in updated], atol=1e-9)
+
+    def test_gating_distance_batch(self):
+        means, covariances = self.randomStates(5)
+        measurements = self.rng.uniform(10, 500, (8, 4))
+
+        for onlyPosition in (False, True):
+            expected = [self.kf.gating_distance(m, c, measurements, onlyPosition) for m, c in zip(means, covariances)]
+            np.testing.assert_allclose(
+                self.kf.gating_distance_batch(means, covariances, measurements, onlyPosition), expected)
+
+    def test_min_cost_assignment(self):
+        for rows, cols in ((5, 8), (8, 5), (6, 6), (1, 4)):
+            cost = self.rng.uniform(0, 1, (rows, cols))
+            trackIndices = list(self.rng.permutation(20)[:rows])
+            detectionIndices = list(self.rng.permutation(20)[:cols])
+
+            expected = referenceAssignment(cost.copy(), 0.5, trackIndices, detectionIndices)
+            result = linear_assignment.min_cost_assignment(cost.copy(), 0.5, trackIndices, detectionIndices)
+            self.assertEqual(result, expected)
+
+    def test_tracker_frame_by_frame(self):
+        for seed in (0, 1):
+            scene = simulateScene(seed=seed)
+
+            # Per-track Kalman filter, per-row costs and the unbounded metric as before
+            with mock.patch.object(iou_matching, 'iou_cost', referenceIouCost), \
+                    mock.patch.object(linear_assignment, 'min_cost_matching', referenceMinCostMatching), \
+                    mock.patch.object(linear_assignment, 'matching_cascade', referenceMatchingCascade), \
+                    mock.patch.object(linear_assignment, 'gate_cost_matrix', referenceGateCostMatrix):
+                expected = runTracker(Tracker(nn_matching.NearestNeighborDistanceMetric('cosine', 0.5)), scene)
+
+            # Budget above the track lengths, so the gallery keeps every sample as the reference does
+            result = runTracker(Tracker(nn_matching.GalleryDistanceMetric(0.5, budget=1000), batched=True), scene)
+
+            self.assertEqual(len(result), len(expected))
+            for frame, (tracks, expectedTracks) in enumerate(zip(result, expected)):
+                self.assertEqual([t[:2] for t in tracks], [t[:2] for t in expectedTracks], 'frame {0}'.format(frame))
+                for (_, _, box), (_, _, expectedBox) in zip(tracks, expectedTracks):
+                    np.testing.assert_allclose(box, expectedBox, atol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,7 +6,6 @@ from datetime import datetime
 
 from application.deep_sort import nn_matching
 from application.deep_sort.tracker import Tracker
-from application.deep_sort.tools import generate_detections as gdet
 
 
 WIDTH = 1248
@@ -15,36 +14,59 @@ HEIGHT = 704
 date = datetime.today().strftime("%d-%m-%Y")
 
 """
-Returns initialized YOLOv4 model for vehicle detection and class names.
+Returns the interpolation for resizing the frame to the network input,
+INTER_AREA for shrinking and the cheaper INTER_LINEAR for enlarging.
 """
-def initYOLO():
+def interpolation(img):
+    if img.shape[1] > WIDTH:
+        return cv2.INTER_AREA
+
+    return cv2.INTER_LINEAR
+
+"""
+Returns names of the COCO classes.
+"""
+def getClassNames():
     with open('./application/resources/coco.names', 'rt') as f:
-        class_names = f.read().rstrip('\n').split('\n')
+        return f.read().rstrip('\n').split('\n')
+
+"""
+Returns initialized YOLOv4 network (or another Darknet model) and class names.
+"""
+def initNet(model='yolov4'):
+    class_names = getClassNames()
 
     net = cv2.dnn.readNetFromDarknet(
-        './application/resources/yolov4.cfg', './application/resources/yolov4.weights')
+        './application/resources/{0}.cfg'.format(model), './application/resources/{0}.weights'.format(model))
 
     # Use GPU if available
     if cv2.cuda.getCudaEnabledDeviceCount() > 0:
         net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
         net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA)
 
-    model = cv2.dnn_DetectionModel(net)
-    model.setInputParams(size=(WIDTH, HEIGHT), scale=1/255)
+    return net, class_names
 
-    return model, class_names
+"""
+Returns a new Deep SORT tracker with its own track IDs. Every track keeps
+its last REID_BUDGET appearance features.
+"""
+def initTracker():
+    metric = nn_matching.GalleryDistanceMetric(
+        matching_threshold=0.5, budget=int(os.getenv('REID_BUDGET', 100)))
+
+    return Tracker(metric, batched=True)
 
 """
-Returns initialized Deep SORT tracker and encoder.
+Returns initialized Deep SORT appearance encoder. All vehicles of a frame
+are encoded together in batches of REID_BATCH_SIZE patches.
 """
-def initDeepSort():
+def initEncoder():
+    # TensorFlow is only imported by the processes that encode
+    from application.deep_sort.tools import generate_detections as gdet
+
     model = './application/resources/mars-small128.pb'
-    encoder = gdet.create_box_encoder(model, batch_size=1)
-    metric = nn_matching.NearestNeighborDistanceMetric(
-        "cosine", matching_threshold=0.5)
-    tracker = Tracker(metric)
 
-    return tracker, encoder
+    return gdet.create_batched_box_encoder(model, batch_size=int(os.getenv('REID_BATCH_SIZE', 16)))
 
 
 """